@@ -1,25 +1,1330 @@
 import sys
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import csv
 import os
-from datetime import datetime
+from datetime import datetime, date
+import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from typing import Dict, List
+import matplotlib.dates as mdates
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from typing import Dict, List, Optional
 import json
 import uuid
+import struct
+import math
+import time
+import argparse
+import functools
+import hashlib
+import bisect
+import calendar
+import gzip
+import queue
+import shutil
+import threading
+from array import array
+from collections import deque
+
+COLUMNS = ["Tipo", "Descripción", "Monto", "Categoría", "Fecha", "Notas", "id"]
+DATE_FORMAT = "%d/%m/%Y"
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_date_ordinal(text: str) -> int:
+    # 0 indica una fecha que no se pudo interpretar; las fechas se repiten mucho
+    try:
+        return datetime.strptime(text, DATE_FORMAT).toordinal()
+    except ValueError:
+        return 0
+
+
+def parse_amount(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+class CsvStorage:
+    extension = ".csv"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def initialize(self):
+        if not self.exists():
+            self.write_rows([])
+
+    def read_rows(self) -> List[List[str]]:
+        if not self.exists():
+            return []
+        with open(self.path, mode="r", newline="", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header
+            return [row for row in reader]
+
+    def read_columns(self, names: List[str]) -> Dict[str, list]:
+        # En CSV hay que parsear la fila completa; solo se descartan los campos no pedidos.
+        # Las filas cortas o vacías se completan como en Ledger
+        rows = [row + [""] * (len(COLUMNS) - len(row)) for row in self.read_rows()]
+        return {name: _convert_column(name, [row[COLUMNS.index(name)] for row in rows])
+                for name in names}
+
+    def write_rows(self, rows: List[List[str]]):
+        # Se escribe en un temporal y se reemplaza para no dejar el archivo a medias
+        temp_path = self.path + ".tmp"
+        with open(temp_path, mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(COLUMNS)
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def append_rows(self, rows: List[List[str]]):
+        with open(self.path, mode="a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def month_index(day: date) -> int:
+    # Meses consecutivos son enteros consecutivos
+    return day.year * 12 + day.month - 1
+
+
+def _convert_column(name: str, values: List[str]) -> list:
+    # Tipos comunes a ambos formatos: Monto como float y Fecha como ordinal
+    if name == "Monto":
+        return [parse_amount(v) for v in values]
+    if name == "Fecha":
+        return [parse_date_ordinal(v) for v in values]
+    return values
+
+
+class ColumnarStorage:
+    # Formato binario columnar para archivos históricos grandes:
+    #   cabecera    MAGIC, versión, cantidad de filas, cantidad de secciones
+    #   directorio  nombre, tipo, offset y largo de cada sección
+    #   secciones   una por columna más la tabla de textos compartida
+    # Monto (float64) y Fecha (ordinal int32) son de ancho fijo, Tipo y Categoría
+    # son códigos uint16 con su propio diccionario y Descripción, Notas e id son
+    # índices uint32 a la tabla de textos. Si el texto original de Monto o Fecha
+    # no coincide con su forma canónica se guarda aparte (secciones dispersas)
+    # para que la conversión desde y hacia CSV no pierda información. Lo mismo
+    # con las filas de otra cantidad de campos: se guarda su largo y los extras.
+
+    extension = ".fcol"
+    MAGIC = b"FCOL"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHII")
+    ENTRY = struct.Struct("<16s2sQQ")
+    STRINGS = "__textos__"
+    CATEGORICAL = ("Tipo", "Categoría")
+    NUMERIC = {"Monto": "d", "Fecha": "i"}
+    TEXT = ("Descripción", "Notas", "id")
+    RAW = {"Monto": "Monto~texto", "Fecha": "Fecha~texto"}
+    WIDTH = "campos~largo"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def initialize(self):
+        if not self.exists():
+            self.write_rows([])
+
+    # --- Escritura ---
+
+    @staticmethod
+    def canonical_amount(value: float) -> str:
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+
+    @staticmethod
+    def _to_bytes(values: array) -> bytes:
+        if sys.byteorder == "big":
+            values = array(values.typecode, values)
+            values.byteswap()
+        return values.tobytes()
+
+    def write_rows(self, rows: List[List[str]]):
+        strings = {"": 0}
+
+        def string_ref(text):
+            return strings.setdefault(text, len(strings))
+
+        # Filas con menos o más campos que COLUMNS: largo original y campos extra
+        irregular = [(i, len(row), [string_ref(value) for value in row[len(COLUMNS):]])
+                     for i, row in enumerate(rows) if len(row) != len(COLUMNS)]
+        rows = [list(row) + [""] * (len(COLUMNS) - len(row)) for row in rows]
+        sections = []
+
+        for name in self.CATEGORICAL:
+            index = COLUMNS.index(name)
+            dictionary = {}
+            codes = array("H", (dictionary.setdefault(row[index], len(dictionary)) for row in rows))
+            payload = bytearray(struct.pack("<I", len(dictionary)))
+            for value in dictionary:
+                encoded = value.encode("utf-8")
+                payload += struct.pack("<H", len(encoded)) + encoded
+            sections.append((name, b"u2", bytes(payload) + self._to_bytes(codes)))
+
+        amounts = array("d")
+        ordinals = array("i")
+        raw = {"Monto": ([], []), "Fecha": ([], [])}
+        monto_index, fecha_index = COLUMNS.index("Monto"), COLUMNS.index("Fecha")
+        for i, row in enumerate(rows):
+            amount = parse_amount(row[monto_index])
+            amounts.append(amount)
+            if math.isnan(amount) or self.canonical_amount(amount) != row[monto_index]:
+                raw["Monto"][0].append(i)
+                raw["Monto"][1].append(string_ref(row[monto_index]))
+
+            ordinal = parse_date_ordinal(row[fecha_index])
+            ordinals.append(ordinal)
+            if not ordinal or date.fromordinal(ordinal).strftime(DATE_FORMAT) != row[fecha_index]:
+                raw["Fecha"][0].append(i)
+                raw["Fecha"][1].append(string_ref(row[fecha_index]))
+
+        sections.append(("Monto", b"f8", self._to_bytes(amounts)))
+        sections.append(("Fecha", b"i4", self._to_bytes(ordinals)))
+
+        for name in self.TEXT:
+            index = COLUMNS.index(name)
+            refs = array("I", (string_ref(row[index]) for row in rows))
+            sections.append((name, b"u4", self._to_bytes(refs)))
+
+        for name, raw_name in self.RAW.items():
+            positions, refs = raw[name]
+            payload = struct.pack("<I", len(positions))
+            payload += self._to_bytes(array("I", positions)) + self._to_bytes(array("I", refs))
+            sections.append((raw_name, b"sp", payload))
+
+        payload = struct.pack("<I", len(irregular))
+        payload += self._to_bytes(array("I", (i for i, _, _ in irregular)))
+        payload += self._to_bytes(array("I", (width for _, width, _ in irregular)))
+        payload += self._to_bytes(array("I", (ref for _, _, extra in irregular for ref in extra)))
+        sections.append((self.WIDTH, b"sp", payload))
+
+        table = bytearray(struct.pack("<I", len(strings)))
+        for text in strings:
+            encoded = text.encode("utf-8")
+            table += struct.pack("<I", len(encoded)) + encoded
+        sections.append((self.STRINGS, b"st", bytes(table)))
+
+        offset = self.HEADER.size + self.ENTRY.size * len(sections)
+        directory = b""
+        for name, kind, payload in sections:
+            directory += self.ENTRY.pack(name.encode("utf-8"), kind, offset, len(payload))
+            offset += len(payload)
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.VERSION, len(rows), len(sections)))
+            file.write(directory)
+            for _, _, payload in sections:
+                file.write(payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+    def append_rows(self, rows: List[List[str]]):
+        # Las columnas son contiguas, agregar implica reescribir el archivo
+        self.write_rows(self.read_rows() + [list(row) for row in rows])
+
+    # --- Lectura ---
+
+    def _read_directory(self, file):
+        magic, version, row_count, section_count = self.HEADER.unpack(file.read(self.HEADER.size))
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"{self.path} no es un archivo columnar válido")
+        directory = {}
+        for _ in range(section_count):
+            name, kind, offset, length = self.ENTRY.unpack(file.read(self.ENTRY.size))
+            directory[name.rstrip(b"\0").decode("utf-8")] = (kind, offset, length)
+        return row_count, directory
+
+    @staticmethod
+    def _from_bytes(typecode: str, payload: bytes) -> array:
+        values = array(typecode)
+        values.frombytes(payload)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def _read_section(self, file, directory, name) -> bytes:
+        _, offset, length = directory[name]
+        file.seek(offset)
+        return file.read(length)
+
+    def _read_strings(self, file, directory) -> List[str]:
+        payload = self._read_section(file, directory, self.STRINGS)
+        (count,) = struct.unpack_from("<I", payload, 0)
+        position = 4
+        strings = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("<I", payload, position)
+            position += 4
+            strings.append(payload[position:position + length].decode("utf-8"))
+            position += length
+        return strings
+
+    def _decode_categorical(self, payload: bytes) -> List[str]:
+        (count,) = struct.unpack_from("<I", payload, 0)
+        position = 4
+        dictionary = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("<H", payload, position)
+            position += 2
+            dictionary.append(payload[position:position + length].decode("utf-8"))
+            position += length
+        return [dictionary[code] for code in self._from_bytes("H", payload[position:])]
+
+    def _decode_sparse(self, payload: bytes):
+        (count,) = struct.unpack_from("<I", payload, 0)
+        positions = self._from_bytes("I", payload[4:4 + 4 * count])
+        refs = self._from_bytes("I", payload[4 + 4 * count:])
+        return positions, refs
+
+    def read_columns(self, names: List[str]) -> Dict[str, list]:
+        # Solo se leen del disco las secciones de las columnas pedidas
+        if not self.exists():
+            return {name: [] for name in names}
+        result = {}
+        with open(self.path, "rb") as file:
+            _, directory = self._read_directory(file)
+            strings = None
+            for name in names:
+                payload = self._read_section(file, directory, name)
+                if name in self.CATEGORICAL:
+                    result[name] = self._decode_categorical(payload)
+                elif name in self.NUMERIC:
+                    result[name] = self._from_bytes(self.NUMERIC[name], payload).tolist()
+                else:
+                    if strings is None:
+                        strings = self._read_strings(file, directory)
+                    result[name] = [strings[ref] for ref in self._from_bytes("I", payload)]
+        return result
+
+    def read_rows(self) -> List[List[str]]:
+        if not self.exists():
+            return []
+        with open(self.path, "rb") as file:
+            _, directory = self._read_directory(file)
+            strings = self._read_strings(file, directory)
+            columns = {}
+            for name in COLUMNS:
+                payload = self._read_section(file, directory, name)
+                if name in self.CATEGORICAL:
+                    columns[name] = self._decode_categorical(payload)
+                elif name in self.TEXT:
+                    columns[name] = [strings[ref] for ref in self._from_bytes("I", payload)]
+            amounts = self._from_bytes("d", self._read_section(file, directory, "Monto"))
+            ordinals = self._from_bytes("i", self._read_section(file, directory, "Fecha"))
+            columns["Monto"] = list(map(self.canonical_amount, amounts))
+            # Las fechas se repiten mucho: se formatea cada ordinal una sola vez
+            date_texts = {0: ""}
+            for value in set(ordinals):
+                if value:
+                    date_texts[value] = date.fromordinal(value).strftime(DATE_FORMAT)
+            columns["Fecha"] = [date_texts[value] for value in ordinals]
+            for name, raw_name in self.RAW.items():
+                positions, refs = self._decode_sparse(self._read_section(file, directory, raw_name))
+                for position, ref in zip(positions, refs):
+                    columns[name][position] = strings[ref]
+            rows = [list(row) for row in zip(*(columns[name] for name in COLUMNS))]
+            if self.WIDTH in directory:
+                self._restore_widths(rows, strings, self._read_section(file, directory, self.WIDTH))
+        return rows
+
+    def _restore_widths(self, rows: List[List[str]], strings: List[str], payload: bytes):
+        (count,) = struct.unpack_from("<I", payload, 0)
+        positions = self._from_bytes("I", payload[4:4 + 4 * count])
+        widths = self._from_bytes("I", payload[4 + 4 * count:4 + 8 * count])
+        extras = iter(self._from_bytes("I", payload[4 + 8 * count:]))
+        for position, width in zip(positions, widths):
+            row = rows[position]
+            del row[width:]
+            row.extend(strings[next(extras)] for _ in range(width - len(COLUMNS)))
+
+
+STORAGE_FORMATS = {"csv": CsvStorage, "columnar": ColumnarStorage}
+
+
+def storage_for_path(path: str):
+    for storage_class in STORAGE_FORMATS.values():
+        if path.endswith(storage_class.extension):
+            return storage_class(path)
+    raise ValueError(f"Formato de archivo no soportado: {path}")
+
+
+def convert_storage(source_path: str, target_path: str) -> int:
+    rows = storage_for_path(source_path).read_rows()
+    storage_for_path(target_path).write_rows(rows)
+    return len(rows)
+
+
+def benchmark_storage(csv_path: str, repetitions: int = 5) -> Dict[str, Dict[str, float]]:
+    columnar_path = os.path.splitext(csv_path)[0] + "_benchmark" + ColumnarStorage.extension
+    convert_storage(csv_path, columnar_path)
+    results = {}
+    try:
+        for label, storage in (("csv", CsvStorage(csv_path)),
+                               ("columnar", ColumnarStorage(columnar_path))):
+            timings = {}
+            for operation, read in (
+                ("filas completas", storage.read_rows),
+                ("Tipo/Categoría/Monto", lambda: storage.read_columns(["Tipo", "Categoría", "Monto"])),
+            ):
+                start = time.perf_counter()
+                for _ in range(repetitions):
+                    read()
+                timings[operation] = (time.perf_counter() - start) / repetitions
+            timings["tamaño (bytes)"] = os.path.getsize(storage.path)
+            results[label] = timings
+    finally:
+        os.remove(columnar_path)
+    return results
+
+
+def run_cli(argv: List[str]):
+    parser = argparse.ArgumentParser(prog="financial-manager.py",
+                                     description="Herramientas para los archivos de datos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    convertir = subparsers.add_parser("convertir", help="Convierte entre CSV y formato columnar (.fcol)")
+    convertir.add_argument("origen")
+    convertir.add_argument("destino")
+
+    benchmark = subparsers.add_parser("benchmark", help="Compara tiempos de carga y tamaño de archivo")
+    benchmark.add_argument("csv")
+    benchmark.add_argument("--repeticiones", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    if args.comando == "convertir":
+        count = convert_storage(args.origen, args.destino)
+        print(f"{count} registros convertidos de {args.origen} a {args.destino}")
+    else:
+        for label, timings in benchmark_storage(args.csv, args.repeticiones).items():
+            print(label)
+            for operation, value in timings.items():
+                print(f"  {operation}: {value:,.6f}" if isinstance(value, float) else f"  {operation}: {value:,}")
+
+
+TIPO_METRICS = {"Ingreso": "Ingresos", "Egreso": "Egresos", "Activo": "Activos", "Pasivo": "Pasivos"}
+RESOLUTIONS = ["Día", "Semana", "Mes", "Trimestre", "Año"]
+BUCKET_DAYS = {"Día": 1, "Semana": 7, "Mes": 30.44, "Trimestre": 91.31, "Año": 365.25}
+
+
+def bucket_bounds(ordinal: int, resolution: str):
+    # Devuelve el ordinal de inicio del período y el del inicio del siguiente
+    day = date.fromordinal(ordinal)
+    if resolution == "Día":
+        return ordinal, ordinal + 1
+    if resolution == "Semana":
+        start = ordinal - day.weekday()
+        return start, start + 7
+    if resolution == "Año":
+        return date(day.year, 1, 1).toordinal(), date(day.year + 1, 1, 1).toordinal()
+    months = 1 if resolution == "Mes" else 3
+    first_month = (day.month - 1) // months * months
+    next_month = first_month + months
+    start = date(day.year, first_month + 1, 1)
+    end = date(day.year + next_month // 12, next_month % 12 + 1, 1)
+    return start.toordinal(), end.toordinal()
+
+
+def choose_resolution(start: int, end: int, max_points: int) -> str:
+    # La resolución más fina que no supere max_points períodos en el rango
+    span = max(end - start + 1, 1)
+    for resolution in RESOLUTIONS:
+        if span / BUCKET_DAYS[resolution] <= max_points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def lttb(xs: List[float], ys: List[float], threshold: int):
+    # Largest-Triangle-Three-Buckets: reduce la serie conservando su forma
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(xs), list(ys)
+    sampled_x, sampled_y = [xs[0]], [ys[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        max_area, chosen = -1.0, range_start
+        for j in range(range_start, range_end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > max_area:
+                max_area, chosen = area, j
+        sampled_x.append(xs[chosen])
+        sampled_y.append(ys[chosen])
+        a = chosen
+    sampled_x.append(xs[-1])
+    sampled_y.append(ys[-1])
+    return sampled_x, sampled_y
+
+
+class TimeSeries:
+    # Montos ordenados cronológicamente para agregar por período cualquier rango
+    def __init__(self, ordinals: List[int], metrics: List[str], amounts: List[float]):
+        self.ordinals = ordinals
+        self.metrics = metrics
+        self.amounts = amounts
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> "TimeSeries":
+        rows = sorted(
+            (fecha, TIPO_METRICS[tipo], monto)
+            for tipo, monto, fecha in zip(columns["Tipo"], columns["Monto"], columns["Fecha"])
+            if fecha and tipo in TIPO_METRICS
+        )
+        return cls([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+
+    def bounds(self):
+        if not self.ordinals:
+            return None
+        return self.ordinals[0], self.ordinals[-1]
+
+    def aggregate(self, resolution: str, start: int = None, end: int = None):
+        # Solo se recorren las filas del rango visible (búsqueda binaria)
+        lo = 0 if start is None else bisect.bisect_left(self.ordinals, start)
+        hi = len(self.ordinals) if end is None else bisect.bisect_right(self.ordinals, end)
+        keys = []
+        sums = {metric: [] for metric in TIPO_METRICS.values()}
+        bucket_end = None
+        for i in range(lo, hi):
+            ordinal = self.ordinals[i]
+            if bucket_end is None or ordinal >= bucket_end:
+                bucket_start, bucket_end = bucket_bounds(ordinal, resolution)
+                keys.append(bucket_start)
+                for values in sums.values():
+                    values.append(0.0)
+            sums[self.metrics[i]][-1] += self.amounts[i]
+        return keys, sums
+
+
+class TimeSeriesChart:
+    # Gráfico temporal con zoom/desplazamiento que vuelve a consultar solo el rango visible
+    MAX_POINTS = 120
+
+    def __init__(self, parent, series: TimeSeries, draw, nrows=1, ncols=1, figsize=(12, 5),
+                 allow_fine=True):
+        self.series = series
+        self.draw_callback = draw
+        self.allow_fine = allow_fine
+        self.pending = None
+        self.widget = parent
+
+        controls = ttk.Frame(parent)
+        controls.pack(fill=tk.X)
+        ttk.Label(controls, text="Resolución:").pack(side=tk.LEFT, padx=5)
+        self.resolution_var = tk.StringVar(value="Automática")
+        resolution_combo = ttk.Combobox(controls, textvariable=self.resolution_var,
+                                        values=["Automática"] + RESOLUTIONS,
+                                        state="readonly", width=12)
+        resolution_combo.pack(side=tk.LEFT, padx=5)
+        resolution_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh(*self.view))
+
+        self.fig, axes = plt.subplots(nrows, ncols, figsize=figsize)
+        self.axes = list(axes) if nrows * ncols > 1 else [axes]
+        self.canvas = FigureCanvasTkAgg(self.fig, parent)
+        NavigationToolbar2Tk(self.canvas, controls).pack(side=tk.LEFT, padx=5)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        self.view = self.series.bounds() or (None, None)
+        self.refresh(*self.view)
+
+    def set_series(self, series: TimeSeries):
+        # Conservar el rango visible si sigue teniendo datos
+        self.series = series
+        bounds = series.bounds()
+        if bounds is None:
+            self.refresh(None, None)
+        elif self.view[0] is None or self.view[1] < bounds[0] or self.view[0] > bounds[1]:
+            self.refresh(*bounds)
+        else:
+            self.refresh(max(self.view[0], bounds[0]), min(self.view[1], bounds[1]))
+
+    def resolution_for(self, start: int, end: int) -> str:
+        automatic = choose_resolution(start, end, self.MAX_POINTS)
+        selected = self.resolution_var.get()
+        if selected not in RESOLUTIONS:
+            return automatic
+        # Los gráficos de barras no pueden mostrar más de MAX_POINTS períodos
+        if not self.allow_fine and RESOLUTIONS.index(selected) < RESOLUTIONS.index(automatic):
+            return automatic
+        return selected
+
+    def refresh(self, start: Optional[int], end: Optional[int]):
+        for ax in self.axes:
+            ax.clear()
+        if start is not None:
+            self.view = (start, end)
+            resolution = self.resolution_for(start, end)
+            keys, sums = self.series.aggregate(resolution, start, end)
+            x = [mdates.date2num(date.fromordinal(key)) for key in keys]
+            self.draw_callback(self.axes, keys, x, sums, resolution)
+            for ax in self.axes:
+                ax.xaxis_date()
+                ax.set_xlim(mdates.date2num(date.fromordinal(start)),
+                            mdates.date2num(date.fromordinal(end + 1)))
+                for label in ax.get_xticklabels():
+                    label.set_rotation(45)
+                # clear() descarta los callbacks, hay que volver a conectarlos
+                ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.fig.tight_layout()
+        self.canvas.draw_idle()
+
+    def on_xlim_changed(self, ax):
+        # Agrupar los eventos de zoom/desplazamiento en una sola consulta
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+        self.pending = self.widget.after(150, self.apply_view, ax.get_xlim())
+
+    def apply_view(self, xlim):
+        self.pending = None
+        bounds = self.series.bounds()
+        if bounds is None:
+            return
+        # Limitar al rango con datos antes de convertir (num2date falla fuera de rango)
+        low = max(xlim[0], mdates.date2num(date.fromordinal(bounds[0])))
+        high = min(xlim[1], mdates.date2num(date.fromordinal(bounds[1])))
+        start = mdates.num2date(low).toordinal()
+        end = mdates.num2date(high).toordinal()
+        if start <= end:
+            self.refresh(start, end)
+
+
+def transaction_fingerprint(row: List[str]) -> str:
+    # Huella de los campos normalizados: Tipo, Monto (centavos), Fecha, Categoría y Descripción
+    amount = parse_amount(row[2])
+    cents = "" if math.isnan(amount) else str(round(amount * 100))
+    normalized = "\x1f".join((
+        row[0].strip().lower(),
+        cents,
+        str(parse_date_ordinal(row[4].strip())),
+        " ".join(row[3].lower().split()),
+        " ".join(row[1].lower().split())
+    ))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FingerprintIndex:
+    # Índice de huellas para detectar duplicados en O(1). El modo aproximado
+    # agrupa por (Tipo, Monto) y busca fechas a ±N días con búsqueda binaria.
+    def __init__(self, cached: Optional[Dict[str, str]] = None):
+        self.cached = cached or {}
+        self.by_id = {}
+        self.by_fingerprint = {}
+        self.by_amount = {}
+
+    @staticmethod
+    def amount_key(row: List[str]):
+        amount = parse_amount(row[2])
+        return row[0].strip().lower(), None if math.isnan(amount) else round(amount * 100)
+
+    def add(self, row: List[str]):
+        entry_id = row[6]
+        # Huella persistida de la sesión anterior (solo se usa una vez, al cargar)
+        fingerprint = self.cached.pop(entry_id, None) or transaction_fingerprint(row)
+        self.by_id[entry_id] = fingerprint
+        self.by_fingerprint.setdefault(fingerprint, set()).add(entry_id)
+        ordinal = parse_date_ordinal(row[4].strip())
+        if ordinal:
+            bisect.insort(self.by_amount.setdefault(self.amount_key(row), []), (ordinal, entry_id))
+
+    def remove(self, row: List[str]):
+        entry_id = row[6]
+        fingerprint = self.by_id.pop(entry_id)
+        ids = self.by_fingerprint[fingerprint]
+        ids.discard(entry_id)
+        if not ids:
+            del self.by_fingerprint[fingerprint]
+        ordinal = parse_date_ordinal(row[4].strip())
+        if ordinal:
+            key = self.amount_key(row)
+            entries = self.by_amount[key]
+            entries.pop(bisect.bisect_left(entries, (ordinal, entry_id)))
+            if not entries:
+                del self.by_amount[key]
+
+    def find(self, row: List[str], fuzzy_days: int = 0) -> List[str]:
+        # Ids de registros existentes que duplican a 'row'
+        matches = set(self.by_fingerprint.get(transaction_fingerprint(row), ()))
+        ordinal = parse_date_ordinal(row[4].strip())
+        if fuzzy_days and ordinal:
+            entries = self.by_amount.get(self.amount_key(row), [])
+            start = bisect.bisect_left(entries, (ordinal - fuzzy_days, ""))
+            for entry_ordinal, entry_id in entries[start:]:
+                if entry_ordinal > ordinal + fuzzy_days:
+                    break
+                matches.add(entry_id)
+        matches.discard(row[6])
+        return sorted(matches)
+
+    def duplicate_groups(self, fuzzy_days: int = 0) -> List[List[str]]:
+        # Una sola pasada sobre el índice, sin comparar pares de registros
+        if not fuzzy_days:
+            return [sorted(ids) for ids in self.by_fingerprint.values() if len(ids) > 1]
+        groups = []
+        for entries in self.by_amount.values():
+            group = [entries[0]]
+            for entry in entries[1:]:
+                if entry[0] - group[-1][0] <= fuzzy_days:
+                    group.append(entry)
+                else:
+                    if len(group) > 1:
+                        groups.append([entry_id for _, entry_id in group])
+                    group = [entry]
+            if len(group) > 1:
+                groups.append([entry_id for _, entry_id in group])
+        return groups
+
+    def save(self, path: str, signature):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"firma": signature, "huellas": self.by_id}, f)
+
+    @staticmethod
+    def load(path: str, signature) -> Dict[str, str]:
+        # Solo sirve si el archivo de datos no cambió desde que se guardó
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data.get("huellas", {}) if data.get("firma") == signature else {}
+
+
+class BalanceIndex:
+    # Sumas prefijas por fecha del patrimonio neto (Activo - Pasivo) y del
+    # balance acumulado (Ingreso - Egreso): el saldo a cualquier fecha es una
+    # búsqueda binaria. Un cambio solo recalcula desde su fecha en adelante.
+    SERIES = {"Ingreso": (1, 1.0), "Egreso": (1, -1.0), "Activo": (0, 1.0), "Pasivo": (0, -1.0)}
+
+    def __init__(self):
+        self.dates = []
+        self.deltas = ([], [])
+        self.prefix = ([], [])
+
+    def apply(self, rows_with_signs):
+        first = None
+        for row, sign in rows_with_signs:
+            if row[0] not in self.SERIES:
+                continue
+            ordinal = parse_date_ordinal(row[4])
+            amount = parse_amount(row[2])
+            if not ordinal or math.isnan(amount):
+                continue
+            index = bisect.bisect_left(self.dates, ordinal)
+            if index == len(self.dates) or self.dates[index] != ordinal:
+                self.dates.insert(index, ordinal)
+                for values in self.deltas + self.prefix:
+                    values.insert(index, 0.0)
+            series, direction = self.SERIES[row[0]]
+            self.deltas[series][index] += sign * direction * amount
+            first = ordinal if first is None else min(first, ordinal)
+        if first is not None:
+            self.recompute(bisect.bisect_left(self.dates, first))
+
+    def recompute(self, start: int):
+        # Solo el sufijo a partir de la fecha más antigua modificada
+        for deltas, prefix in zip(self.deltas, self.prefix):
+            running = prefix[start - 1] if start else 0.0
+            for index in range(start, len(deltas)):
+                running += deltas[index]
+                prefix[index] = running
+
+    def as_of(self, ordinal: int):
+        # (patrimonio neto, balance acumulado) al cierre del día indicado
+        index = bisect.bisect_right(self.dates, ordinal) - 1
+        if index < 0:
+            return 0.0, 0.0
+        return self.prefix[0][index], self.prefix[1][index]
+
+
+class Ledger:
+    # Registros en memoria indexados por id, en el orden del archivo.
+    # Mantiene totales y cantidades por (Tipo, Categoría), totales por mes y
+    # categoría, los saldos acumulados por fecha y las huellas de duplicados
+    # de forma incremental.
+    def __init__(self, rows: List[List[str]], fingerprints: Optional[Dict[str, str]] = None):
+        self.entries = {}
+        self.category_totals = {}
+        self.category_counts = {}
+        self.monthly_totals = {}
+        self.category_versions = {}
+        self.balances = BalanceIndex()
+        self.fingerprints = FingerprintIndex(fingerprints)
+        self.repaired = False
+        for row in rows:
+            row = list(row) + [""] * (len(COLUMNS) - len(row))
+            # Filas sin id o con id repetido reciben uno nuevo
+            if not row[6] or row[6] in self.entries:
+                row[6] = uuid.uuid4().hex
+                self.repaired = True
+            self.entries[row[6]] = row
+            self._account(row, 1)
+        self.balances.apply((row, 1) for row in self.entries.values())
+
+    def _account(self, row: List[str], sign: int):
+        tipo, categoria = row[0], row[3]
+        totals = self.category_totals.setdefault(tipo, {})
+        counts = self.category_counts.setdefault(tipo, {})
+        amount = parse_amount(row[2])
+        amount = 0.0 if math.isnan(amount) else amount
+        totals[categoria] = totals.get(categoria, 0.0) + sign * amount
+        counts[categoria] = counts.get(categoria, 0) + sign
+        ordinal = parse_date_ordinal(row[4])
+        if ordinal:
+            monthly = self.monthly_totals.setdefault((tipo, categoria), {})
+            month = month_index(date.fromordinal(ordinal))
+            monthly[month] = monthly.get(month, 0.0) + sign * amount
+        # Permite a los cachés saber qué categorías cambiaron
+        self.category_versions[(tipo, categoria)] = self.category_versions.get((tipo, categoria), 0) + 1
+        if not counts[categoria]:
+            del counts[categoria]
+            del totals[categoria]
+        if sign > 0:
+            self.fingerprints.add(row)
+        else:
+            self.fingerprints.remove(row)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self.entries
+
+    def get(self, entry_id: str) -> List[str]:
+        return self.entries[entry_id]
+
+    def rows(self) -> List[List[str]]:
+        return list(self.entries.values())
+
+    def add(self, rows: List[List[str]]):
+        for row in rows:
+            self.entries[row[6]] = row
+            self._account(row, 1)
+        self.balances.apply((row, 1) for row in rows)
+
+    def update(self, row: List[str]) -> List[str]:
+        # Reemplaza la fila (nunca se modifica en el lugar) y devuelve la anterior
+        old_row = self.entries[row[6]]
+        self.entries[row[6]] = row
+        self._account(old_row, -1)
+        self._account(row, 1)
+        self.balances.apply([(old_row, -1), (row, 1)])
+        return old_row
+
+    def delete(self, entry_ids: List[str]) -> List[List[str]]:
+        removed = [self.entries.pop(entry_id) for entry_id in entry_ids]
+        for row in removed:
+            self._account(row, -1)
+        self.balances.apply((row, -1) for row in removed)
+        return removed
+
+    def can_apply(self, changes) -> bool:
+        # Verifica que el estado actual sea el esperado por los cambios
+        for entry_id, old, new in changes:
+            current = self.entries.get(entry_id)
+            if (old is None and current is not None) or (old is not None and current != list(old)):
+                return False
+        return True
+
+    def apply(self, changes):
+        # Los saldos acumulados se recalculan una sola vez para todo el lote
+        balance_changes = []
+        for entry_id, old, new in changes:
+            if old is not None:
+                old_row = self.entries.pop(entry_id) if new is None else self.entries[entry_id]
+                self._account(old_row, -1)
+                balance_changes.append((old_row, -1))
+            if new is not None:
+                new_row = list(new)
+                self.entries[entry_id] = new_row
+                self._account(new_row, 1)
+                balance_changes.append((new_row, 1))
+        self.balances.apply(balance_changes)
+
+    def category_count(self, tipo: str, categoria: str) -> int:
+        return self.category_counts.get(tipo, {}).get(categoria, 0)
+
+    def recategorize(self, tipo: str, mapping: Dict[str, str]) -> List[List[str]]:
+        # Renombra/fusiona categorías de un Tipo en una sola pasada y devuelve
+        # las filas anteriores de los registros modificados
+        mapping = {old: new for old, new in mapping.items()
+                   if old != new and self.category_count(tipo, old)}
+        if not mapping:
+            return []
+        old_rows = []
+        for entry_id, row in self.entries.items():
+            if row[0] == tipo and row[3] in mapping:
+                old_rows.append(row)
+                new_row = list(row)
+                new_row[3] = mapping[row[3]]
+                self.entries[entry_id] = new_row
+                # La categoría forma parte de la huella
+                self.fingerprints.remove(row)
+                self.fingerprints.add(new_row)
+
+        # Los agregados se mueven de categoría sin recalcular. Primero se retiran
+        # todos los orígenes: un destino puede ser a su vez origen (intercambios)
+        totals = self.category_totals[tipo]
+        counts = self.category_counts[tipo]
+        moved = {old: (totals.pop(old), counts.pop(old), self.monthly_totals.pop((tipo, old), {}))
+                 for old in mapping}
+        for old, (total, count, old_monthly) in moved.items():
+            new = mapping[old]
+            totals[new] = totals.get(new, 0.0) + total
+            counts[new] = counts.get(new, 0) + count
+            new_monthly = self.monthly_totals.setdefault((tipo, new), {})
+            for month, amount in old_monthly.items():
+                new_monthly[month] = new_monthly.get(month, 0.0) + amount
+            for key in ((tipo, old), (tipo, new)):
+                self.category_versions[key] = self.category_versions.get(key, 0) + 1
+        return old_rows
+
+    def monthly_total(self, tipo: str, categoria: str, month: int) -> float:
+        return self.monthly_totals.get((tipo, categoria), {}).get(month, 0.0)
+
+    def category_version(self, tipo: str, categoria: str) -> int:
+        return self.category_versions.get((tipo, categoria), 0)
+
+    def columns(self, names: List[str]) -> Dict[str, list]:
+        rows = self.entries.values()
+        return {name: _convert_column(name, [row[COLUMNS.index(name)] for row in rows])
+                for name in names}
+
+
+FREQUENCIES = {
+    "Semanal": (7, 0),
+    "Quincenal": (14, 0),
+    "Mensual": (0, 1),
+    "Trimestral": (0, 3),
+    "Anual": (0, 12)
+}
+RECURRING_NAMESPACE = uuid.UUID("6f1c2a8e-4b7d-4e0a-9c3f-2d5e8b1a7c40")
+
+
+def add_months(start: date, months: int) -> date:
+    # Mismo día del mes que start, ajustado al último día si el mes es más corto
+    month_index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(month_index, 12)
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return date(year, month + 1, min(start.day, last_day))
+
+
+def recurring_occurrences(rule: Dict[str, str], until: date) -> List[date]:
+    # Fechas pendientes de la regla hasta 'until', a partir de la última materializada.
+    # Se salta directamente al primer período pendiente en lugar de recorrer el historial.
+    start = datetime.strptime(rule["inicio"], DATE_FORMAT).date()
+    end = until
+    if rule.get("fin"):
+        end = min(end, datetime.strptime(rule["fin"], DATE_FORMAT).date())
+    last = datetime.strptime(rule["ultima"], DATE_FORMAT).date() if rule.get("ultima") else None
+    days, months = FREQUENCIES[rule["frecuencia"]]
+
+    if days:
+        first = 0 if last is None else max(0, (last - start).days // days + 1)
+        return [date.fromordinal(ordinal)
+                for ordinal in range(start.toordinal() + first * days, end.toordinal() + 1, days)]
+
+    step = 0
+    if last is not None:
+        step = max(0, ((last.year - start.year) * 12 + last.month - start.month) // months)
+        if add_months(start, step * months) <= last:
+            step += 1
+    occurrences = []
+    current = add_months(start, step * months)
+    while current <= end:
+        occurrences.append(current)
+        step += 1
+        current = add_months(start, step * months)
+    return occurrences
+
+
+def materialize_recurring(rules: List[Dict[str, str]], ledger: Ledger, until: date) -> List[List[str]]:
+    # El id de cada ocurrencia se deriva de la regla y la fecha: volver a
+    # materializar (por ejemplo tras un reinicio) nunca duplica registros. Como
+    # cualquier alta, se omiten también los que duplican la huella de otro registro
+    # (por ejemplo, una regla eliminada y vuelta a crear).
+    rows = []
+    seen = set()
+    for rule in rules:
+        occurrences = recurring_occurrences(rule, until)
+        for occurrence in occurrences:
+            entry_id = uuid.uuid5(RECURRING_NAMESPACE, f"{rule['id']}:{occurrence.toordinal()}").hex
+            row = [
+                rule["Tipo"],
+                rule["Descripción"],
+                rule["Monto"],
+                rule["Categoría"],
+                occurrence.strftime(DATE_FORMAT),
+                rule.get("Notas", ""),
+                entry_id
+            ]
+            fingerprint = transaction_fingerprint(row)
+            if entry_id not in ledger and fingerprint not in seen and not ledger.fingerprints.find(row):
+                seen.add(fingerprint)
+                rows.append(row)
+        if occurrences:
+            rule["ultima"] = occurrences[-1].strftime(DATE_FORMAT)
+    return rows
+
+
+class BudgetPlanner:
+    # Gasto vs presupuesto y pronósticos por categoría de Egreso. Los
+    # pronósticos (suavizado exponencial doble) se calculan vectorizados para
+    # todas las categorías a la vez y se guardan en caché; solo se recalculan
+    # las categorías cuya versión en el ledger cambió o si cambió el mes.
+    ALPHA = 0.5
+    BETA = 0.3
+
+    def __init__(self, ledger: "Ledger", history_months: int, horizon: int):
+        self.ledger = ledger
+        self.history_months = max(history_months, 2)
+        self.horizon = horizon
+        self.cache = {}
+
+    def projections(self, categories: List[str], today: date) -> Dict[str, Dict[str, object]]:
+        current = month_index(today)
+        stale = [categoria for categoria in categories
+                 if self.cache.get(categoria, (None, None))[:2]
+                 != (self.ledger.category_version("Egreso", categoria), current)]
+        if stale:
+            self.compute(stale, current)
+
+        # Fin de mes: lo gastado más la parte restante del pronóstico del mes.
+        # Depende del día, por eso se calcula al leer y no se guarda en caché
+        days_in_month = calendar.monthrange(today.year, today.month)[1]
+        remaining = 1 - today.day / days_in_month
+        projections = {}
+        for categoria in categories:
+            spent, forecast = self.cache[categoria][2]
+            projections[categoria] = {
+                "gastado": spent,
+                "fin_de_mes": spent + remaining * forecast[0],
+                "pronostico": forecast[1:]
+            }
+        return projections
+
+    def compute(self, categories: List[str], current: int):
+        # Matriz categorías x meses completos anteriores al mes actual
+        months = range(current - self.history_months, current)
+        history = np.array([[self.ledger.monthly_total("Egreso", categoria, month) for month in months]
+                            for categoria in categories])
+        # Cada fila arranca en su primer mes con movimientos: los meses previos no
+        # son gasto cero y sembrar el suavizado con ellos inflaría la tendencia
+        columns = history.shape[1]
+        rows = np.arange(len(categories))
+        first = np.argmax(history != 0, axis=1)
+        level = history[rows, first]
+        trend = np.where(first + 1 < columns,
+                         history[rows, np.minimum(first + 1, columns - 1)] - level, 0.0)
+        for column in range(1, columns):
+            started = column > first
+            new_level = self.ALPHA * history[:, column] + (1 - self.ALPHA) * (level + trend)
+            new_trend = self.BETA * (new_level - level) + (1 - self.BETA) * trend
+            level = np.where(started, new_level, level)
+            trend = np.where(started, new_trend, trend)
+        forecast = np.maximum(level[:, None] + trend[:, None] * np.arange(1, self.horizon + 2), 0.0)
+
+        for i, categoria in enumerate(categories):
+            self.cache[categoria] = (
+                self.ledger.category_version("Egreso", categoria),
+                current,
+                (self.ledger.monthly_total("Egreso", categoria, current),
+                 [float(value) for value in forecast[i]])
+            )
+
+    def alerts(self, budgets: Dict[str, float], today: date) -> List[str]:
+        projections = self.projections(list(budgets), today)
+        alerts = []
+        for categoria, limit in budgets.items():
+            projection = projections[categoria]
+            if projection["gastado"] > limit:
+                alerts.append(f"{categoria}: excedido ({projection['gastado'] / limit:.0%})")
+            elif projection["fin_de_mes"] > limit:
+                alerts.append(f"{categoria}: proyectado {projection['fin_de_mes'] / limit:.0%}")
+        return alerts
+
+
+class BackupManager:
+    # Respaldos comprimidos y rotativos del archivo de datos
+    def __init__(self, path: str, directory: str, interval: float, retention: int, max_bytes: int):
+        self.path = path
+        self.directory = directory
+        self.interval = interval
+        self.retention = retention
+        self.max_bytes = max_bytes
+        backups = self.backups()
+        self.last_backup = os.path.getmtime(backups[-1]) if backups else 0.0
+
+    def backups(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        prefix = os.path.basename(self.path) + "."
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(".gz"))
+
+    def backup_if_due(self):
+        if time.time() - self.last_backup >= self.interval and os.path.exists(self.path):
+            self.backup()
+
+    def backup(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = os.path.join(self.directory, f"{os.path.basename(self.path)}.{stamp}.gz")
+        with open(self.path, "rb") as source, gzip.open(target + ".tmp", "wb") as destination:
+            shutil.copyfileobj(source, destination)
+        os.replace(target + ".tmp", target)
+        self.last_backup = time.time()
+        self.prune()
+
+    def prune(self):
+        # Se conservan los más recientes dentro de la cantidad y el tamaño máximos
+        backups = self.backups()
+        total = 0
+        for index, backup in enumerate(reversed(backups)):
+            total += os.path.getsize(backup)
+            if index > 0 and (index >= self.retention or total > self.max_bytes):
+                os.remove(backup)
+
+
+class WriteBehindWriter:
+    # Persiste en segundo plano los cambios ya aplicados en memoria.
+    # Las operaciones se agrupan durante flush_interval segundos: de varias
+    # reescrituras solo se escribe la última, seguida de los agregados posteriores.
+    def __init__(self, storage, flush_interval: float, backups: Optional[BackupManager] = None):
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.backups = backups
+        self.queue = queue.Queue()
+        self.pending = []
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def append(self, rows: List[List[str]]):
+        self.queue.put(("append", rows))
+
+    def rewrite(self, rows: List[List[str]]):
+        self.queue.put(("rewrite", rows))
+
+    def request_flush(self) -> threading.Event:
+        # Sin bloquear: el evento se activa cuando todo lo anterior fue procesado
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        return done
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return self.request_flush().wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        done = threading.Event()
+        self.queue.put(("stop", done))
+        return done.wait(timeout)
+
+    def run(self):
+        running = True
+        while running:
+            # Con escrituras fallidas pendientes se reintenta aunque no lleguen operaciones
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval if self.pending else None)]
+            except queue.Empty:
+                self.write_pending()
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1][0] in ("append", "rewrite"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # El respaldo se toma antes de escribir, con el último estado en disco
+            if self.backups is not None:
+                try:
+                    self.backups.backup_if_due()
+                except Exception as error:
+                    self.error = error
+            self.pending.extend(op for op in batch if op[0] in ("append", "rewrite"))
+            self.write_pending()
+
+            # Los eventos se señalan siempre para que flush/close nunca queden esperando
+            for kind, payload in batch:
+                if kind in ("flush", "stop"):
+                    payload.set()
+                if kind == "stop":
+                    running = False
+
+    def write_pending(self):
+        if not self.pending:
+            return
+        last_rewrite = max((i for i, op in enumerate(self.pending) if op[0] == "rewrite"), default=-1)
+        appended = [row for kind, rows in self.pending[last_rewrite + 1:] for row in rows]
+        try:
+            if last_rewrite >= 0:
+                self.storage.write_rows(self.pending[last_rewrite][1] + appended)
+            elif appended:
+                self.storage.append_rows(appended)
+        except Exception as error:
+            # Cualquier fallo queda registrado sin detener el hilo; se reintenta en el próximo ciclo con las operaciones pendientes
+            self.error = error
+            return
+        self.pending = []
+        self.error = None
+
+
+class CommandHistory:
+    # Historial acotado de cambios para deshacer/rehacer. Cada comando guarda,
+    # por id, la fila anterior y la nueva (None si no existía o se eliminó),
+    # así su inversa se aplica en O(k) sin releer los datos.
+    def __init__(self, limit: int, max_changes: int, path: Optional[str] = None):
+        self.limit = limit
+        self.max_changes = max_changes
+        self.path = path
+        self.undo_stack = deque()
+        self.redo_stack = []
+        if path:
+            self.load()
+
+    @staticmethod
+    def inverse(changes):
+        return [(entry_id, new, old) for entry_id, old, new in reversed(changes)]
+
+    def record(self, description: str, changes):
+        if not changes:
+            return
+        self.undo_stack.append((description, changes))
+        self.redo_stack.clear()
+        # Acotar la memoria: cantidad de comandos y de filas guardadas
+        total = sum(len(c) for _, c in self.undo_stack)
+        while len(self.undo_stack) > self.limit or (total > self.max_changes and len(self.undo_stack) > 1):
+            total -= len(self.undo_stack.popleft()[1])
+
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    def undo(self):
+        # Devuelve la descripción y los cambios a aplicar para deshacer
+        description, changes = self.undo_stack.pop()
+        self.redo_stack.append((description, changes))
+        return description, self.inverse(changes)
+
+    def redo(self):
+        description, changes = self.redo_stack.pop()
+        self.undo_stack.append((description, changes))
+        return description, changes
+
+    def discard(self):
+        # Se descarta el historial si ya no coincide con los datos
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.undo_stack = deque((d, [tuple(c) for c in changes]) for d, changes in data.get("deshacer", []))
+        self.redo_stack = [(d, [tuple(c) for c in changes]) for d, changes in data.get("rehacer", [])]
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"deshacer": list(self.undo_stack), "rehacer": self.redo_stack}, f, ensure_ascii=False)
+
+
+class UpdateScheduler:
+    # Agrupa los refrescos pedidos en un único pase por ciclo ocioso de Tk
+    def __init__(self, root):
+        self.root = root
+        self.pending = {}
+        self.handle = None
+
+    def request(self, name: str, callback):
+        # Pedir el mismo refresco varias veces antes del pase no lo repite
+        self.pending[name] = callback
+        if self.handle is None:
+            self.handle = self.root.after_idle(self.flush)
+
+    def flush(self):
+        self.handle = None
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
 
 class FinancialManager:
     def __init__(self):
-        self.csv_file = "financial_data.csv"
         self.config_file = "config.json"
+        self.settings_file = "settings.json"
+        self.recurring_file = "recurrentes.json"
+        self.history_file = "historial.json"
+        self.budgets_file = "presupuestos.json"
+        self.settings = self.load_settings()
         self.categories = self.load_categories()
+        self.storage = self.create_storage()
         self.setup_main_window()
-        self.initialize_csv()
+        self.scheduler = UpdateScheduler(self.root)
+        self.graph_refreshers = []
+        self.status_clear_handle = None
+        self.storage.initialize()
+        self.fingerprint_file = os.path.splitext(self.storage.path)[0] + "_huellas.json"
+        self.ledger = Ledger(
+            self.storage.read_rows(),
+            FingerprintIndex.load(self.fingerprint_file, self.data_signature())
+        )
+        self.writer = self.create_writer()
+        self.reported_error = None
+        if self.ledger.repaired:
+            self.writer.rewrite(self.ledger.rows())
+        self.history = CommandHistory(
+            self.settings["limite_historial"],
+            self.settings["limite_cambios_historial"],
+            self.history_file if self.settings["guardar_historial"] else None
+        )
+        self.budgets = self.load_budgets()
+        self.planner = BudgetPlanner(
+            self.ledger,
+            self.settings["meses_historial_pronostico"],
+            self.settings["meses_pronostico"]
+        )
+        self.active_filter = None
         self.create_widgets()
         self.load_data()
         self.update_historical_totals()
+        self.update_budget_alerts()
+        self.recurring_rules = self.load_recurring_rules()
+        # Última fecha de cada regla cuyos registros ya están en disco
+        self.confirmed_watermarks = self.watermarks()
+        self.materialize_recurring()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.check_persistence()
 
     def resource_path(self, relative_path):
         try:
@@ -30,15 +1335,96 @@ class FinancialManager:
         return os.path.join(base_path, relative_path)
 
     def show_category_config(self):
-        def save_callback(new_categories):
+        def save_callback(new_categories, remaps):
             self.categories = new_categories
             # Guardar en el archivo de configuración
             with open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.categories, f, indent=4)
             # Actualizar el combobox de categorías
             self.update_category_options()
+            # Los presupuestos siguen a las categorías renombradas. Se retiran todos
+            # los orígenes antes de asignar, como en Ledger.recategorize
+            moved = {old: self.budgets.pop(old) for old in remaps.get("Egreso", {}) if old in self.budgets}
+            for old, limit in moved.items():
+                self.budgets.setdefault(remaps["Egreso"][old], limit)
+            self.budgets = {name: limit for name, limit in self.budgets.items()
+                            if name in self.categories.get("Egreso", [])}
+            self.save_budgets()
+            # Las reglas recurrentes también, para no volver a generar la categoría vieja
+            renamed = False
+            for rule in self.recurring_rules:
+                new = remaps.get(rule["Tipo"], {}).get(rule["Categoría"])
+                if new is not None:
+                    rule["Categoría"] = new
+                    renamed = True
+            if renamed:
+                self.save_recurring_rules()
+            # Aplicar renombres, fusiones y reasignaciones al historial
+            count = self.recategorize(remaps)
+            if count:
+                self.notify(f"Categorías actualizadas en {count} registros")
+
+        CategoryManager(self.root, self.categories, save_callback, self.ledger.category_count)
+
+    def recategorize(self, remaps: Dict[str, Dict[str, str]]) -> int:
+        # Una pasada en memoria y una sola reescritura en segundo plano. No se
+        # registra para deshacer: config.json y presupuestos.json ya cambiaron, y
+        # los comandos anteriores usan los nombres viejos, así que se descartan
+        changes = []
+        for tipo, mapping in remaps.items():
+            for old_row in self.ledger.recategorize(tipo, mapping):
+                changes.append((old_row[6], old_row, self.ledger.get(old_row[6])))
+        if changes:
+            self.history.discard()
+            self.propagate_changes(changes)
+        return len(changes)
+
+    def commit_changes(self, description: str, changes):
+        # Los cambios ya están aplicados en el ledger: registrarlos y propagarlos
+        if not changes:
+            return
+        self.history.record(description, changes)
+        self.propagate_changes(changes)
+
+    def propagate_changes(self, changes):
+        # Solo agregados: se anexan al archivo; cualquier otro cambio lo reescribe
+        if all(old is None for _, old, _ in changes):
+            self.writer.append([list(new) for _, _, new in changes])
+        else:
+            self.writer.rewrite(self.ledger.rows())
+        self.update_table(changes)
+        self.schedule_refresh()
+
+    @staticmethod
+    def editing_text(event) -> bool:
+        # Los atajos no actúan mientras se escribe en un campo de texto
+        return event is not None and isinstance(event.widget, (tk.Entry, ttk.Entry, tk.Text))
+
+    def undo(self, event=None):
+        if self.editing_text(event):
+            return
+        if not self.history.can_undo():
+            self.notify("No hay cambios para deshacer")
+            return
+        self.apply_history(*self.history.undo(), "Deshecho")
+
+    def redo(self, event=None):
+        if self.editing_text(event):
+            return
+        if not self.history.can_redo():
+            self.notify("No hay cambios para rehacer")
+            return
+        self.apply_history(*self.history.redo(), "Rehecho")
 
-        CategoryManager(self.root, self.categories, save_callback)
+    def apply_history(self, description: str, changes, action: str):
+        if not self.ledger.can_apply(changes):
+            self.history.discard()
+            messagebox.showwarning("Advertencia", "Los datos cambiaron y el historial ya no es válido. "
+                                   "Se descartó el historial de cambios.")
+            return
+        self.ledger.apply(changes)
+        self.propagate_changes(changes)
+        self.notify(f"{action}: {description}")
 
     def load_categories(self) -> Dict[str, List[str]]:
         default_categories = {
@@ -55,6 +1441,176 @@ class FinancialManager:
                 json.dump(default_categories, f, indent=4)
             return default_categories
 
+    def load_budgets(self) -> Dict[str, float]:
+        try:
+            with open(self.budgets_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_budgets(self):
+        with open(self.budgets_file, 'w', encoding='utf-8') as f:
+            json.dump(self.budgets, f, indent=4, ensure_ascii=False)
+
+    def show_budget_config(self):
+        def save_callback(new_budgets):
+            self.budgets = new_budgets
+            self.save_budgets()
+            self.update_budget_alerts()
+            self.notify("Presupuestos guardados")
+
+        BudgetManager(self.root, self.categories.get("Egreso", []), self.budgets, self.planner, save_callback)
+
+    def update_budget_alerts(self):
+        # Solo se recalculan las categorías modificadas desde la última vez
+        alerts = self.planner.alerts(self.budgets, date.today())
+        self.alerts_var.set("Alertas: " + "; ".join(alerts) if alerts else "")
+
+    def load_recurring_rules(self) -> List[Dict[str, str]]:
+        try:
+            with open(self.recurring_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def save_recurring_rules(self):
+        # En disco solo se guarda la última fecha confirmada de cada regla
+        rules = [{**rule, "ultima": self.confirmed_watermarks.get(rule["id"], "")}
+                 for rule in self.recurring_rules]
+        with open(self.recurring_file, 'w', encoding='utf-8') as f:
+            json.dump(rules, f, indent=4, ensure_ascii=False)
+
+    def watermarks(self) -> Dict[str, str]:
+        return {rule["id"]: rule.get("ultima", "") for rule in self.recurring_rules}
+
+    def materialize_recurring(self) -> int:
+        # Todas las ocurrencias vencidas se agregan en un solo lote
+        rows = materialize_recurring(self.recurring_rules, self.ledger, date.today())
+        if rows:
+            self.ledger.add(rows)
+            self.commit_changes("Generar recurrentes", [(row[6], None, row) for row in rows])
+        # Las fechas avanzan en disco cuando el escritor confirma los registros, sin
+        # bloquear la interfaz. Si falla se conservan las anteriores: los ids son
+        # deterministas, así que volver a generar no duplica registros
+        self.confirm_watermarks(self.writer.request_flush(), self.watermarks())
+        self.save_recurring_rules()
+        return len(rows)
+
+    def confirm_watermarks(self, done: threading.Event, watermarks: Dict[str, str]):
+        if not done.is_set():
+            self.root.after(200, self.confirm_watermarks, done, watermarks)
+            return
+        if self.writer.error is None:
+            self.confirmed_watermarks.update(watermarks)
+            self.save_recurring_rules()
+
+    def show_recurring_config(self):
+        def save_callback(new_rules):
+            self.recurring_rules = new_rules
+            count = self.materialize_recurring()
+            self.notify(f"Reglas recurrentes guardadas ({count} registros generados)")
+
+        RecurringManager(self.root, self.categories, self.recurring_rules, save_callback)
+
+    def load_settings(self) -> Dict[str, object]:
+        default_settings = {
+            "formato_datos": "csv",
+            "archivo_datos": "financial_data",
+            "intervalo_guardado_segundos": 2,
+            "espera_cierre_segundos": 30,
+            "carpeta_respaldos": "respaldos",
+            "intervalo_respaldos_minutos": 60,
+            "respaldos_maximos": 10,
+            "tamaño_maximo_respaldos_mb": 50,
+            "limite_historial": 100,
+            "limite_cambios_historial": 50000,
+            "guardar_historial": True,
+            "dias_duplicados_aproximados": 0,
+            "meses_historial_pronostico": 12,
+            "meses_pronostico": 3
+        }
+        try:
+            with open(self.settings_file, 'r', encoding='utf-8') as f:
+                return {**default_settings, **json.load(f)}
+        except FileNotFoundError:
+            with open(self.settings_file, 'w', encoding='utf-8') as f:
+                json.dump(default_settings, f, indent=4)
+            return default_settings
+
+    def create_storage(self):
+        base_name = self.settings["archivo_datos"]
+        storage_class = STORAGE_FORMATS.get(self.settings["formato_datos"], CsvStorage)
+        storage = storage_class(base_name + storage_class.extension)
+        # Migrar los datos si se cambió de formato. Se toma el archivo más reciente
+        # y luego se archiva, para que volver al formato anterior no cargue datos viejos
+        current = os.path.getmtime(storage.path) if storage.exists() else None
+        candidates = [other for other in (other_class(base_name + other_class.extension)
+                                          for other_class in STORAGE_FORMATS.values()
+                                          if other_class is not storage_class)
+                      if other.exists() and (current is None or os.path.getmtime(other.path) > current)]
+        if candidates:
+            source = max(candidates, key=lambda other: os.path.getmtime(other.path))
+            storage.write_rows(source.read_rows())
+            os.replace(source.path, source.path + ".migrado")
+        return storage
+
+    def create_writer(self) -> WriteBehindWriter:
+        backups = BackupManager(
+            self.storage.path,
+            self.settings["carpeta_respaldos"],
+            self.settings["intervalo_respaldos_minutos"] * 60,
+            self.settings["respaldos_maximos"],
+            self.settings["tamaño_maximo_respaldos_mb"] * 1024 * 1024
+        )
+        return WriteBehindWriter(self.storage, self.settings["intervalo_guardado_segundos"], backups)
+
+    def check_persistence(self):
+        # Los errores de escritura ocurren en otro hilo; se informan desde aquí,
+        # una sola vez por error distinto mientras persista
+        error = None if self.writer.error is None else str(self.writer.error)
+        if error is not None and error != self.reported_error:
+            self.notify(f"Error al guardar los datos: {error}", duration=10000)
+        elif error is None and self.reported_error is not None:
+            self.notify("Datos guardados")
+        self.reported_error = error
+        self.root.after(5000, self.check_persistence)
+
+    def data_signature(self):
+        try:
+            stat = os.stat(self.storage.path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def on_close(self):
+        # Garantizar que todo lo pendiente quede en disco antes de salir
+        closed = self.writer.close(timeout=self.settings["espera_cierre_segundos"])
+        self.history.save()
+        if not closed or self.writer.thread.is_alive():
+            error = "el guardado no terminó a tiempo"
+        else:
+            error = self.writer.error
+        if error is None:
+            # Las huellas se guardan junto con la firma del archivo ya escrito
+            self.ledger.fingerprints.save(self.fingerprint_file, self.data_signature())
+            # Todo está en disco: las fechas de las reglas quedan confirmadas
+            self.confirmed_watermarks.update(self.watermarks())
+            self.save_recurring_rules()
+        else:
+            if not messagebox.askyesno("Error", "No se pudieron guardar todos los datos "
+                                       f"({error}). ¿Salir de todos modos?"):
+                self.restart_writer()
+                return
+        self.root.destroy()
+
+    def restart_writer(self):
+        # Un escritor detenido se reemplaza recién cuando terminó su última escritura
+        if self.writer.thread.is_alive():
+            self.root.after(500, self.restart_writer)
+            return
+        self.writer = self.create_writer()
+        self.writer.rewrite(self.ledger.rows())
+
     def setup_main_window(self):
         self.root = tk.Tk()
         self.root.title("Gestor Financiero")
@@ -99,12 +1655,6 @@ class FinancialManager:
             rowheight=30
         )
 
-    def initialize_csv(self):
-        if not os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="w", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerow(["Tipo", "Descripción", "Monto", "Categoría", "Fecha", "Notas", "id"])
-
     def create_widgets(self):
         # Main container
         self.main_container = ttk.Frame(self.root)
@@ -114,6 +1664,37 @@ class FinancialManager:
         self.create_input_summary_frame()
         self.create_filter_frame()
         self.create_table_frame()
+        self.create_status_bar()
+
+    def create_status_bar(self):
+        self.status_var = tk.StringVar()
+        ttk.Label(self.root, textvariable=self.status_var, anchor=tk.W,
+                  relief=tk.SUNKEN, padding=(10, 2)).pack(side=tk.BOTTOM, fill=tk.X,
+                                                          before=self.main_container)
+
+    def notify(self, message: str, duration: int = 5000):
+        # Aviso no bloqueante en la barra de estado
+        self.status_var.set(message)
+        if self.status_clear_handle is not None:
+            self.root.after_cancel(self.status_clear_handle)
+        self.status_clear_handle = self.root.after(duration, self.clear_status)
+
+    def clear_status(self):
+        self.status_clear_handle = None
+        self.status_var.set("")
+
+    def schedule_refresh(self):
+        # Resumen y gráficos abiertos se refrescan una sola vez por ciclo;
+        # la tabla se actualiza fila por fila en update_table
+        self.scheduler.request("resumen", self.refresh_summary)
+        self.scheduler.request("presupuestos", self.update_budget_alerts)
+        if self.graph_refreshers:
+            self.scheduler.request("gráficos", self.refresh_graphs)
+
+    def refresh_graphs(self):
+        series = self.get_time_series()
+        for refresh in list(self.graph_refreshers):
+            refresh(series)
 
     def create_input_summary_frame(self):
         input_summary_frame = ttk.Frame(self.main_container)
@@ -150,7 +1731,8 @@ class FinancialManager:
             "Egresos": tk.StringVar(),
             "Balance": tk.StringVar(),
             "Activos": tk.StringVar(),
-            "Pasivos": tk.StringVar()
+            "Pasivos": tk.StringVar(),
+            "Patrimonio": tk.StringVar()
         }
 
         # Create summary labels
@@ -158,6 +1740,12 @@ class FinancialManager:
             ttk.Label(summary_frame, text=f"{key}:").grid(row=0, column=i*2, padx=5, pady=5)
             ttk.Label(summary_frame, textvariable=var).grid(row=0, column=i*2+1, padx=5, pady=5)
 
+        # Alertas de presupuesto
+        self.alerts_var = tk.StringVar()
+        ttk.Label(summary_frame, textvariable=self.alerts_var, foreground=self.colors["danger"],
+                  wraplength=500).grid(row=1, column=0, columnspan=len(self.summary_vars) * 2,
+                                       padx=5, pady=5, sticky=tk.W)
+
     def create_input_fields(self, frame):
         # Tipo
         ttk.Label(frame, text="Tipo:").grid(row=0, column=0, padx=5, pady=5)
@@ -196,6 +1784,12 @@ class FinancialManager:
         ttk.Button(button_frame, text="Configurar Categorías", 
                 command=self.show_category_config, 
                 style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Recurrentes", 
+                command=self.show_recurring_config, 
+                style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Presupuestos", 
+                command=self.show_budget_config, 
+                style="Custom.TButton").pack(side=tk.LEFT, padx=5)
 
     def create_filter_frame(self):
         filter_frame = ttk.LabelFrame(self.main_container, text="Filtros", padding=10)
@@ -233,6 +1827,10 @@ class FinancialManager:
                   command=self.filter_data, 
                   style="Custom.TButton").pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(filter_frame, text="Ver Todo", 
+                  command=self.show_all, 
+                  style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(filter_frame, text="Ver Gráficos", 
                   command=self.show_graphs,
                   style="Custom.TButton").pack(side=tk.LEFT, padx=5)
@@ -253,6 +1851,25 @@ class FinancialManager:
                   command=self.delete_entry,
                   style="Custom.TButton").pack(side=tk.LEFT, padx=5)
 
+        ttk.Button(buttons_frame, text="Deshacer", 
+                  command=self.undo,
+                  style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(buttons_frame, text="Rehacer", 
+                  command=self.redo,
+                  style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(buttons_frame, text="Importar CSV", 
+                  command=self.import_csv,
+                  style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(buttons_frame, text="Buscar Duplicados", 
+                  command=self.show_duplicates,
+                  style="Custom.TButton").pack(side=tk.LEFT, padx=5)
+
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+
         # Create Treeview
         columns = ("Tipo", "Descripción", "Monto", "Categoría", "Fecha", "Notas", "id")
         self.table = ttk.Treeview(table_frame, columns=columns, show="headings", style="Custom.Treeview")
@@ -273,39 +1890,15 @@ class FinancialManager:
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.table.pack(fill=tk.BOTH, expand=True)
         
-    def add_entry(self):
-        # Validación de datos
-        if not self.validate_entry():
-            return
-
-        # Agregar entrada al CSV
-        entry_id = str(uuid.uuid4().hex)  # Remove the comma by converting to string first
-        with open(self.csv_file, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                self.tipo_var.get(),
-                self.descripcion_var.get(),
-                self.monto_var.get(),
-                self.categoria_var.get(),
-                self.fecha_var.get(),
-                self.notas_var.get(),
-                entry_id
-            ])
-
-        self.load_data()
-        self.clear_entries()
-        self.update_historical_totals()
-        messagebox.showinfo("Éxito", "Entrada agregada correctamente")
-    
     def edit_entry(self):
         selected_item = self.table.selection()
         if not selected_item:
             messagebox.showwarning("Advertencia", "Por favor selecciona un registro para editar")
             return
 
-        # Get the values of the selected item
-        values = self.table.item(selected_item[0])['values']
-        entry_id = values[6]  # Get the ID from the hidden column
+        # Get the values of the selected item (the table uses the ID as item id)
+        entry_id = selected_item[0]
+        values = self.ledger.get(entry_id)
 
         # Create edit window
         edit_window = tk.Toplevel(self.root)
@@ -351,35 +1944,21 @@ class FinancialManager:
         update_categories()  # Call once to set initial categories
 
         def save_changes():
-            # Read all entries
-            entries = []
-            with open(self.csv_file, mode="r", newline="", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                entries = list(reader)
-
-            # Update the matching entry
-            for i, row in enumerate(entries):
-                if len(row) > 6 and row[6] == entry_id:
-                    entries[i] = [
-                        tipo_var.get(),
-                        descripcion_var.get(),
-                        monto_var.get(),
-                        categoria_var.get(),
-                        fecha_var.get(),
-                        notas_var.get(),
-                        entry_id
-                    ]
-                    break
-
-            # Write all entries back to the file
-            with open(self.csv_file, mode="w", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                writer.writerows(entries)
+            # Update the entry in memory; the file is rewritten in the background
+            new_row = [
+                tipo_var.get(),
+                descripcion_var.get(),
+                monto_var.get(),
+                categoria_var.get(),
+                fecha_var.get(),
+                notas_var.get(),
+                entry_id
+            ]
+            old_row = self.ledger.update(new_row)
+            self.commit_changes("Editar registro", [(entry_id, old_row, new_row)])
 
-            self.load_data()
-            self.update_historical_totals()
             edit_window.destroy()
-            messagebox.showinfo("Éxito", "Registro actualizado correctamente")
+            self.notify("Registro actualizado correctamente")
 
         ttk.Button(edit_window, text="Guardar", command=save_changes).pack(pady=20)
         
@@ -393,22 +1972,83 @@ class FinancialManager:
             return
 
         # Get the ID of the selected item
-        entry_id = self.table.item(selected_item[0])['values'][6]
+        entry_id = selected_item[0]
 
-        # Read all entries except the one to delete
-        entries = []
-        with open(self.csv_file, mode="r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            entries = [row for row in reader if len(row) <= 6 or row[6] != entry_id]
+        # Remove it from memory; the file is rewritten in the background
+        old_row = self.ledger.delete([entry_id])[0]
+        self.commit_changes("Eliminar registro", [(entry_id, old_row, None)])
 
-        # Write the remaining entries back to the file
-        with open(self.csv_file, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerows(entries)
+        self.notify("Registro eliminado correctamente")
 
-        self.load_data()
-        self.update_historical_totals()
-        messagebox.showinfo("Éxito", "Registro eliminado correctamente")
+    def import_csv(self):
+        path = filedialog.askopenfilename(title="Importar CSV", filetypes=[("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            rows = CsvStorage(path).read_rows()
+        except (OSError, UnicodeDecodeError, csv.Error) as error:
+            messagebox.showerror("Error", f"No se pudo leer el archivo: {error}")
+            return
+
+        # Cada fila se compara en O(1) contra el índice de huellas y contra las ya
+        # aceptadas del mismo archivo (exportaciones bancarias superpuestas)
+        fuzzy_days = self.settings["dias_duplicados_aproximados"]
+        accepted = FingerprintIndex()
+        imported, duplicates, invalid = [], 0, 0
+        for row in rows:
+            row = (list(row) + [""] * len(COLUMNS))[:6] + [uuid.uuid4().hex]
+            if (row[0] not in self.categories or math.isnan(parse_amount(row[2]))
+                    or not parse_date_ordinal(row[4])):
+                invalid += 1
+            elif self.ledger.fingerprints.find(row, fuzzy_days) or accepted.find(row, fuzzy_days):
+                duplicates += 1
+            else:
+                accepted.add(row)
+                imported.append(row)
+
+        self.ledger.add(imported)
+        self.commit_changes("Importar CSV", [(row[6], None, row) for row in imported])
+        self.notify(f"{len(imported)} registros importados, {duplicates} duplicados omitidos, "
+                    f"{invalid} inválidos")
+
+    def show_duplicates(self):
+        groups = self.ledger.fingerprints.duplicate_groups(self.settings["dias_duplicados_aproximados"])
+        if not groups:
+            self.notify("No se encontraron registros duplicados")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Registros Duplicados")
+        window.geometry("900x400")
+
+        ttk.Label(window, text=f"{len(groups)} grupos de posibles duplicados").pack(padx=10, pady=5)
+
+        tree = ttk.Treeview(window, columns=COLUMNS[:6], show="tree headings")
+        tree.column("#0", width=90, stretch=False)
+        for col in COLUMNS[:6]:
+            tree.heading(col, text=col)
+            tree.column(col, width=100)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        for number, group in enumerate(groups, 1):
+            parent = tree.insert("", tk.END, text=f"Grupo {number}", open=True)
+            for entry_id in group:
+                tree.insert(parent, tk.END, iid=entry_id, values=self.ledger.get(entry_id)[:6])
+
+        def delete_selected():
+            entry_ids = [item for item in tree.selection() if item in self.ledger]
+            if not entry_ids:
+                messagebox.showwarning("Advertencia", "Selecciona los registros a eliminar", parent=window)
+                return
+            if not messagebox.askyesno("Confirmar", f"¿Eliminar {len(entry_ids)} registros?", parent=window):
+                return
+            removed = self.ledger.delete(entry_ids)
+            self.commit_changes("Eliminar duplicados", [(row[6], row, None) for row in removed])
+            for entry_id in entry_ids:
+                tree.delete(entry_id)
+            self.notify(f"{len(removed)} registros eliminados")
+
+        ttk.Button(window, text="Eliminar seleccionados", command=delete_selected).pack(pady=5)
 
     def update_category_options(self, event=None):
         tipo = self.tipo_var.get()
@@ -421,23 +2061,30 @@ class FinancialManager:
         if not self.validate_entry():
             return
 
-        # Agregar entrada al CSV
-        with open(self.csv_file, mode="a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                self.tipo_var.get(),
-                self.descripcion_var.get(),
-                self.monto_var.get(),
-                self.categoria_var.get(),
-                self.fecha_var.get(),
-                self.notas_var.get(),
-                uuid.uuid4().hex
-            ])
+        # Agregar entrada en memoria; se guarda en segundo plano
+        row = [
+            self.tipo_var.get(),
+            self.descripcion_var.get(),
+            self.monto_var.get(),
+            self.categoria_var.get(),
+            self.fecha_var.get(),
+            self.notas_var.get(),
+            uuid.uuid4().hex
+        ]
+        # Detectar duplicados (por ejemplo, un doble clic en "Agregar")
+        duplicates = self.ledger.fingerprints.find(row, self.settings["dias_duplicados_aproximados"])
+        if duplicates:
+            existing = self.ledger.get(duplicates[0])
+            if not messagebox.askyesno("Posible duplicado",
+                                       f"Ya existe un registro similar: {existing[1]} "
+                                       f"por {existing[2]} el {existing[4]}.\n¿Agregar de todos modos?"):
+                return
+
+        self.ledger.add([row])
+        self.commit_changes("Agregar registro", [(row[6], None, row)])
 
-        self.load_data()
         self.clear_entries()
-        self.update_historical_totals()
-        messagebox.showinfo("Éxito", "Entrada agregada correctamente")
+        self.notify("Entrada agregada correctamente")
 
     def validate_entry(self) -> bool:
         # Validar campos requeridos
@@ -482,44 +2129,64 @@ class FinancialManager:
         self.notas_var.set('')
 
     def load_data(self):
+        self.active_filter = None
+
         # Limpiar tabla
         for item in self.table.get_children():
             self.table.delete(item)
 
-        # Cargar datos del CSV
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    self.table.insert("", tk.END, values=row)
+        # Cargar datos en memoria
+        for row in self.ledger.rows():
+            self.table.insert("", tk.END, iid=row[6], values=row)
+
+    def show_all(self):
+        self.load_data()
+        self.update_historical_totals()
 
     def filter_data(self):
-        month = self.month_var.get()
-        year = self.year_var.get()
-        tipo = self.tipo_filter_var.get()
+        self.active_filter = (self.month_var.get(), self.year_var.get(), self.tipo_filter_var.get())
 
         # Limpiar tabla
         for item in self.table.get_children():
             self.table.delete(item)
 
         # Cargar datos filtrados
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    if tipo == "Todos" and row[0] == "Todos":
-                        self.table.insert("", tk.END, values=row)
-                        continue
-                    fecha = datetime.strptime(row[4], "%d/%m/%Y")
-                    if (fecha.strftime("%m") == month and 
-                        fecha.strftime("%Y") == year and 
-                        (tipo == "Todos" or row[0] == tipo)):
-                        self.table.insert("", tk.END, values=row)
+        for row in self.ledger.rows():
+            if self.row_visible(row):
+                self.table.insert("", tk.END, iid=row[6], values=row)
 
         self.update_summary()
 
+    def row_visible(self, row: List[str]) -> bool:
+        if self.active_filter is None:
+            return True
+        month, year, tipo = self.active_filter
+        if tipo == "Todos" and row[0] == "Todos":
+            return True
+        fecha = datetime.strptime(row[4], DATE_FORMAT)
+        return (fecha.strftime("%m") == month and 
+                fecha.strftime("%Y") == year and 
+                (tipo == "Todos" or row[0] == tipo))
+
+    def update_table(self, changes):
+        # Actualización incremental de la tabla, sin recargarla
+        for entry_id, old, new in changes:
+            visible = new is not None and self.row_visible(new)
+            if self.table.exists(entry_id):
+                if visible:
+                    self.table.item(entry_id, values=new)
+                else:
+                    self.table.delete(entry_id)
+            elif visible:
+                self.table.insert("", tk.END, iid=entry_id, values=new)
+
+    def refresh_summary(self):
+        # Con un filtro activo el resumen corresponde a los registros visibles
+        if self.active_filter is None:
+            self.update_historical_totals()
+        else:
+            self.update_summary()
+
     def update_summary(self):
         totals = {
             "Ingresos": 0,
@@ -548,6 +2215,7 @@ class FinancialManager:
         self.summary_vars["Balance"].set(f"${totals['Ingresos'] - totals['Egresos']:,.2f}")
         self.summary_vars["Activos"].set(f"${totals['Activos']:,.2f}")
         self.summary_vars["Pasivos"].set(f"${totals['Pasivos']:,.2f}")
+        self.summary_vars["Patrimonio"].set(f"${totals['Activos'] - totals['Pasivos']:,.2f}")
 
     def update_historical_totals(self):
         totals = {
@@ -557,22 +2225,9 @@ class FinancialManager:
             "Pasivos": 0
         }
 
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    tipo = row[0]
-                    monto = float(row[2])
-                    
-                    if tipo == "Ingreso":
-                        totals["Ingresos"] += monto
-                    elif tipo == "Egreso":
-                        totals["Egresos"] += monto
-                    elif tipo == "Activo":
-                        totals["Activos"] += monto
-                    elif tipo == "Pasivo":
-                        totals["Pasivos"] += monto
+        # Los totales por categoría ya están calculados en memoria
+        for tipo, metric in TIPO_METRICS.items():
+            totals[metric] = sum(self.ledger.category_totals.get(tipo, {}).values())
 
         self.update_summary_with_totals(totals)
 
@@ -582,6 +2237,9 @@ class FinancialManager:
         self.summary_vars["Balance"].set(
             f"${totals['Ingresos'] - totals['Egresos']:,.2f}"
         )
+        self.summary_vars["Patrimonio"].set(
+            f"${totals['Activos'] - totals['Pasivos']:,.2f}"
+        )
 
     def show_graphs(self):
         graph_window = tk.Toplevel(self.root)
@@ -591,131 +2249,128 @@ class FinancialManager:
         notebook = ttk.Notebook(graph_window)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
+        # Serie temporal compartida por los gráficos de la ventana
+        series = self.get_time_series()
+
         # Crear pestañas para diferentes gráficos
-        self.create_monthly_analysis_tab(notebook)
-        self.create_category_analysis_tab(notebook)
-        self.create_trend_analysis_tab(notebook)
+        refreshers = [
+            self.create_monthly_analysis_tab(notebook, series),
+            self.create_category_analysis_tab(notebook),
+            self.create_trend_analysis_tab(notebook, series),
+            self.create_net_worth_tab(notebook, series)
+        ]
 
-    def create_monthly_analysis_tab(self, notebook):
+        # Los gráficos abiertos se actualizan con cada modificación de los datos
+        self.graph_refreshers.extend(refreshers)
+
+        def on_close(event):
+            if event.widget is graph_window:
+                for refresh in refreshers:
+                    self.graph_refreshers.remove(refresh)
+
+        graph_window.bind("<Destroy>", on_close)
+
+    def create_monthly_analysis_tab(self, notebook, series):
         tab = ttk.Frame(notebook)
         notebook.add(tab, text="Análisis Mensual")
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        
-        # Datos para los gráficos
-        data = self.get_monthly_data()
-        
-        # Gráfico de barras - Ingresos vs Egresos
-        months = data.keys()
-        ingresos = [d['Ingresos'] for d in data.values()]
-        egresos = [d['Egresos'] for d in data.values()]
-        
-        x = range(len(months))
-        width = 0.35
-        
-        ax1.bar([i - width/2 for i in x], ingresos, width, label='Ingresos', color='green')
-        ax1.bar([i + width/2 for i in x], egresos, width, label='Egresos', color='red')
-        ax1.set_title('Ingresos vs Egresos por Mes')
-        ax1.set_xticks(x)
-        ax1.set_xticklabels(months, rotation=45)
-        ax1.legend()
-        
-        # Gráfico de línea - Balance Neto
-        balance = [d['Ingresos'] - d['Egresos'] for d in data.values()]
-        ax2.plot(months, balance, marker='o', color='blue')
-        ax2.set_title('Balance Neto por Mes')
-        ax2.set_xticklabels(months, rotation=45)
-        plt.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, tab)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def draw(axes, keys, x, sums, resolution):
+            ax1, ax2 = axes
+            
+            # Gráfico de barras - Ingresos vs Egresos
+            width = BUCKET_DAYS[resolution] * 0.35
+            ax1.bar([i - width/2 for i in x], sums['Ingresos'], width, label='Ingresos', color='green')
+            ax1.bar([i + width/2 for i in x], sums['Egresos'], width, label='Egresos', color='red')
+            ax1.set_title(f'Ingresos vs Egresos por {resolution}')
+            ax1.legend()
+            
+            # Gráfico de línea - Balance Neto
+            balance = [i - e for i, e in zip(sums['Ingresos'], sums['Egresos'])]
+            bx, by = lttb(x, balance, TimeSeriesChart.MAX_POINTS)
+            ax2.plot(bx, by, marker='o', color='blue')
+            ax2.set_title(f'Balance Neto por {resolution}')
+
+        chart = TimeSeriesChart(tab, series, draw, nrows=1, ncols=2, figsize=(12, 5), allow_fine=False)
+        return chart.set_series
 
     def create_category_analysis_tab(self, notebook):
         tab = ttk.Frame(notebook)
         notebook.add(tab, text="Análisis por Categoría")
 
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
-        
-        # Datos para los gráficos
-        categoria_data = self.get_category_data()
-        
-        # Gráfico de torta - Ingresos por categoría
-        ingresos = categoria_data['Ingreso']
-        if ingresos:
-            ax1.pie(ingresos.values(), labels=ingresos.keys(), autopct='%1.1f%%')
-            ax1.set_title('Distribución de Ingresos')
-        
-        # Gráfico de torta - Egresos por categoría
-        egresos = categoria_data['Egreso']
-        if egresos:
-            ax2.pie(egresos.values(), labels=egresos.keys(), autopct='%1.1f%%')
-            ax2.set_title('Distribución de Egresos')
-        
-        plt.tight_layout()
-        
         canvas = FigureCanvasTkAgg(fig, tab)
-        canvas.draw()
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-    def create_trend_analysis_tab(self, notebook):
+        def draw(series=None):
+            ax1.clear()
+            ax2.clear()
+            
+            # Datos para los gráficos
+            categoria_data = self.get_category_data()
+            
+            # Gráfico de torta - Ingresos por categoría
+            ingresos = categoria_data['Ingreso']
+            if ingresos:
+                ax1.pie(ingresos.values(), labels=ingresos.keys(), autopct='%1.1f%%')
+                ax1.set_title('Distribución de Ingresos')
+            
+            # Gráfico de torta - Egresos por categoría
+            egresos = categoria_data['Egreso']
+            if egresos:
+                ax2.pie(egresos.values(), labels=egresos.keys(), autopct='%1.1f%%')
+                ax2.set_title('Distribución de Egresos')
+            
+            fig.tight_layout()
+            canvas.draw_idle()
+
+        draw()
+        return draw
+
+    def create_trend_analysis_tab(self, notebook, series):
         tab = ttk.Frame(notebook)
         notebook.add(tab, text="Análisis de Tendencias")
 
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # Datos para el gráfico
-        data = self.get_monthly_data()
-        months = list(data.keys())
-        
-        # Crear líneas de tendencia para diferentes métricas
-        metrics = ['Ingresos', 'Egresos', 'Activos', 'Pasivos']
-        colors = ['green', 'red', 'blue', 'orange']
-        
-        for metric, color in zip(metrics, colors):
-            values = [d[metric] for d in data.values()]
-            ax.plot(months, values, marker='o', label=metric, color=color)
-        
-        ax.set_title('Tendencias Financieras')
-        ax.set_xticklabels(months, rotation=45)
-        ax.legend()
-        plt.tight_layout()
-        
-        canvas = FigureCanvasTkAgg(fig, tab)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        def draw(axes, keys, x, sums, resolution):
+            ax = axes[0]
+            
+            # Crear líneas de tendencia para diferentes métricas
+            metrics = ['Ingresos', 'Egresos', 'Activos', 'Pasivos']
+            colors = ['green', 'red', 'blue', 'orange']
+            
+            for metric, color in zip(metrics, colors):
+                mx, my = lttb(x, sums[metric], TimeSeriesChart.MAX_POINTS)
+                ax.plot(mx, my, marker='o', label=metric, color=color)
+            
+            ax.set_title(f'Tendencias Financieras por {resolution}')
+            ax.legend()
 
-    def get_monthly_data(self) -> Dict[str, Dict[str, float]]:
-        data = {}
-        
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    fecha = datetime.strptime(row[4], "%d/%m/%Y")
-                    mes = fecha.strftime("%b %Y")
-                    tipo = row[0]
-                    monto = float(row[2])
-                    
-                    if mes not in data:
-                        data[mes] = {
-                            "Ingresos": 0,
-                            "Egresos": 0,
-                            "Activos": 0,
-                            "Pasivos": 0
-                        }
-                    
-                    if tipo == "Ingreso":
-                        data[mes]["Ingresos"] += monto
-                    elif tipo == "Egreso":
-                        data[mes]["Egresos"] += monto
-                    elif tipo == "Activo":
-                        data[mes]["Activos"] += monto
-                    elif tipo == "Pasivo":
-                        data[mes]["Pasivos"] += monto
-        
-        return dict(sorted(data.items()))
+        chart = TimeSeriesChart(tab, series, draw, figsize=(12, 6))
+        return chart.set_series
+
+    def create_net_worth_tab(self, notebook, series):
+        tab = ttk.Frame(notebook)
+        notebook.add(tab, text="Patrimonio Neto")
+
+        def draw(axes, keys, x, sums, resolution):
+            ax = axes[0]
+            
+            # Saldos al cierre de cada período, consultados en el índice acumulado
+            closing = [self.ledger.balances.as_of(bucket_bounds(key, resolution)[1] - 1) for key in keys]
+            lines = [('Patrimonio Neto', 'purple'), ('Balance Acumulado', 'blue')]
+            
+            for index, (label, color) in enumerate(lines):
+                lx, ly = lttb(x, [values[index] for values in closing], TimeSeriesChart.MAX_POINTS)
+                ax.plot(lx, ly, marker='o', label=label, color=color)
+            
+            ax.axhline(0, color='gray', linewidth=0.8)
+            ax.set_title(f'Patrimonio Neto y Balance Acumulado por {resolution}')
+            ax.legend()
+
+        chart = TimeSeriesChart(tab, series, draw, figsize=(12, 6))
+        return chart.set_series
+
+    def get_time_series(self) -> TimeSeries:
+        return TimeSeries.from_columns(self.ledger.columns(["Tipo", "Monto", "Fecha"]))
 
     def get_category_data(self) -> Dict[str, Dict[str, float]]:
         data = {
@@ -725,32 +2380,43 @@ class FinancialManager:
             "Pasivo": {}
         }
         
-        if os.path.exists(self.csv_file):
-            with open(self.csv_file, mode="r", encoding="utf-8") as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    tipo = row[0]
-                    categoria = row[3]
-                    monto = float(row[2])
-                    
-                    if categoria not in data[tipo]:
-                        data[tipo][categoria] = 0
-                    data[tipo][categoria] += monto
-    
-    
+        # Copia de los agregados mantenidos por el ledger
+        for tipo in data:
+            data[tipo] = dict(self.ledger.category_totals.get(tipo, {}))
         
         return data
     
 class CategoryManager:
-    def __init__(self, parent, categories, save_callback):
+    def __init__(self, parent, categories, save_callback, count_callback):
         self.window = tk.Toplevel(parent)
         self.window.title("Configuración de Categorías")
         self.window.geometry("600x400")
-        self.categories = categories.copy()
+        # Copia de las listas para que "Cancelar" no modifique las originales
+        self.categories = {tipo: list(names) for tipo, names in categories.items()}
         self.save_callback = save_callback
+        self.count_callback = count_callback
+        # Reasignaciones pendientes por tipo: categoría original -> categoría final
+        self.remaps = {tipo: {} for tipo in self.categories}
         self.create_widgets()
 
+    def affected_rows(self, tipo, name) -> int:
+        # Registros que hoy terminarían en esta categoría, incluyendo reasignaciones pendientes
+        remap = self.remaps[tipo]
+        count = 0 if name in remap else self.count_callback(tipo, name)
+        return count + sum(self.count_callback(tipo, old) for old, new in remap.items() if new == name)
+
+    def record_remap(self, tipo, old_name, new_name):
+        remap = self.remaps[tipo]
+        for original, target in list(remap.items()):
+            if target == old_name:
+                remap[original] = new_name
+        if old_name not in remap:
+            remap[old_name] = new_name
+        # Descartar renombres que vuelven al nombre original
+        for original, target in list(remap.items()):
+            if original == target:
+                del remap[original]
+
     def create_widgets(self):
         # Notebook para pestañas de tipos
         self.notebook = ttk.Notebook(self.window)
@@ -858,12 +2524,23 @@ class CategoryManager:
         def save():
             new_name = entry.get().strip()
             if new_name:
-                if new_name != old_name and new_name in self.tabs[tipo]['categories']:
-                    messagebox.showerror("Error", "Esta categoría ya existe")
+                if new_name == old_name:
+                    dialog.destroy()
                     return
-                self.tabs[tipo]['listbox'].delete(index)
-                self.tabs[tipo]['listbox'].insert(index, new_name)
-                self.tabs[tipo]['categories'][self.tabs[tipo]['categories'].index(old_name)] = new_name
+                count = self.affected_rows(tipo, old_name)
+                if new_name in self.tabs[tipo]['categories']:
+                    # Renombrar a una categoría existente las fusiona
+                    if not messagebox.askyesno(
+                            "Fusionar", f"'{new_name}' ya existe. ¿Fusionar '{old_name}' en '{new_name}'?\n"
+                            f"Se actualizarán {count} registros.", parent=dialog):
+                        return
+                    self.tabs[tipo]['listbox'].delete(index)
+                    self.tabs[tipo]['categories'].remove(old_name)
+                else:
+                    self.tabs[tipo]['listbox'].delete(index)
+                    self.tabs[tipo]['listbox'].insert(index, new_name)
+                    self.tabs[tipo]['categories'][self.tabs[tipo]['categories'].index(old_name)] = new_name
+                self.record_remap(tipo, old_name, new_name)
                 dialog.destroy()
             else:
                 messagebox.showerror("Error", "El nombre no puede estar vacío")
@@ -876,21 +2553,276 @@ class CategoryManager:
             messagebox.showwarning("Aviso", "Por favor selecciona una categoría para eliminar")
             return
 
-        if messagebox.askyesno("Confirmar", "¿Estás seguro de eliminar esta categoría?"):
-            index = selection[0]
-            category = self.tabs[tipo]['listbox'].get(index)
+        index = selection[0]
+        category = self.tabs[tipo]['listbox'].get(index)
+        count = self.affected_rows(tipo, category)
+        others = [name for name in self.tabs[tipo]['categories'] if name != category]
+
+        def remove(target=None):
             self.tabs[tipo]['listbox'].delete(index)
             self.tabs[tipo]['categories'].remove(category)
+            if target:
+                self.record_remap(tipo, category, target)
+
+        if not count or not others:
+            if messagebox.askyesno("Confirmar", "¿Estás seguro de eliminar esta categoría?"):
+                remove()
+            return
+
+        # La categoría tiene registros: elegir a cuál reasignarlos
+        dialog = tk.Toplevel(self.window)
+        dialog.title("Eliminar Categoría")
+        dialog.geometry("320x130")
+        dialog.transient(self.window)
+        dialog.grab_set()
+
+        ttk.Label(dialog, text=f"{count} registros usan '{category}'. Reasignarlos a:").pack(padx=10, pady=5)
+        target_var = tk.StringVar(value="Otros" if "Otros" in others else others[0])
+        ttk.Combobox(dialog, textvariable=target_var, values=others, state="readonly").pack(padx=10, pady=5)
+
+        def save():
+            remove(target_var.get())
+            dialog.destroy()
+
+        ttk.Button(dialog, text="Eliminar y reasignar", command=save).pack(pady=5)
 
     def save_categories(self):
         # Actualizar diccionario de categorías
         for tipo in self.categories:
             self.categories[tipo] = list(self.tabs[tipo]['categories'])
         
-        # Llamar al callback con las nuevas categorías
-        self.save_callback(self.categories)
+        # Llamar al callback con las nuevas categorías y las reasignaciones
+        self.save_callback(self.categories, self.remaps)
+        self.window.destroy()
+
+class RecurringManager:
+    def __init__(self, parent, categories, rules, save_callback):
+        self.window = tk.Toplevel(parent)
+        self.window.title("Transacciones Recurrentes")
+        self.window.geometry("800x400")
+        self.categories = categories
+        self.rules = [dict(rule) for rule in rules]
+        self.save_callback = save_callback
+        self.create_widgets()
+
+    def create_widgets(self):
+        columns = ("Tipo", "Descripción", "Monto", "Categoría", "frecuencia", "inicio", "fin")
+        self.table = ttk.Treeview(self.window, columns=columns, show="headings")
+        for col in columns:
+            self.table.heading(col, text=col.capitalize())
+            self.table.column(col, width=100)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        for rule in self.rules:
+            self.table.insert("", tk.END, iid=rule["id"], values=[rule.get(col, "") for col in columns])
+
+        # Botones
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        ttk.Button(button_frame, text="Agregar", 
+                  command=self.add_rule).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Editar", 
+                  command=self.edit_rule).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Eliminar", 
+                  command=self.delete_rule).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Guardar", 
+                  command=self.save_rules).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="Cancelar", 
+                  command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def add_rule(self):
+        self.rule_dialog()
+
+    def edit_rule(self):
+        selection = self.table.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Por favor selecciona una regla para editar")
+            return
+        self.rule_dialog(next(rule for rule in self.rules if rule["id"] == selection[0]))
+
+    def rule_dialog(self, rule=None):
+        # Editar conserva el id de la regla: las ocurrencias ya generadas no se repiten
+        dialog = tk.Toplevel(self.window)
+        dialog.title("Editar Recurrente" if rule else "Agregar Recurrente")
+        dialog.geometry("320x460")
+        dialog.transient(self.window)
+        dialog.grab_set()
+
+        fields = {
+            "Tipo": tk.StringVar(),
+            "Categoría": tk.StringVar(),
+            "Descripción": tk.StringVar(),
+            "Monto": tk.StringVar(),
+            "frecuencia": tk.StringVar(value="Mensual"),
+            "inicio": tk.StringVar(value=datetime.now().strftime(DATE_FORMAT)),
+            "fin": tk.StringVar(),
+            "Notas": tk.StringVar()
+        }
+        if rule:
+            for key, var in fields.items():
+                var.set(rule.get(key, ""))
+
+        ttk.Label(dialog, text="Tipo:").pack(pady=2)
+        tipo_combo = ttk.Combobox(dialog, textvariable=fields["Tipo"], 
+                                  values=list(self.categories.keys()), state="readonly")
+        tipo_combo.pack(pady=2)
+
+        ttk.Label(dialog, text="Categoría:").pack(pady=2)
+        categoria_combo = ttk.Combobox(dialog, textvariable=fields["Categoría"], state="readonly")
+        categoria_combo.pack(pady=2)
+
+        def update_categories(event=None):
+            if fields["Tipo"].get() in self.categories:
+                categoria_combo['values'] = self.categories[fields["Tipo"].get()]
+                categoria_combo.set('')
+
+        tipo_combo.bind('<<ComboboxSelected>>', update_categories)
+        if rule and rule["Tipo"] in self.categories:
+            categoria_combo['values'] = self.categories[rule["Tipo"]]
+
+        for key, label in (("Descripción", "Descripción:"), ("Monto", "Monto:")):
+            ttk.Label(dialog, text=label).pack(pady=2)
+            ttk.Entry(dialog, textvariable=fields[key]).pack(pady=2)
+
+        ttk.Label(dialog, text="Frecuencia:").pack(pady=2)
+        ttk.Combobox(dialog, textvariable=fields["frecuencia"], 
+                     values=list(FREQUENCIES.keys()), state="readonly").pack(pady=2)
+
+        for key, label in (("inicio", "Inicio (DD/MM/YYYY):"), ("fin", "Fin (opcional):"), 
+                           ("Notas", "Notas:")):
+            ttk.Label(dialog, text=label).pack(pady=2)
+            ttk.Entry(dialog, textvariable=fields[key]).pack(pady=2)
+
+        def save():
+            values = {key: var.get().strip() for key, var in fields.items()}
+            for key in ("Tipo", "Categoría", "Descripción", "Monto", "inicio"):
+                if not values[key]:
+                    messagebox.showerror("Error", f"El campo {key} es requerido", parent=dialog)
+                    return
+            try:
+                float(values["Monto"])
+            except ValueError:
+                messagebox.showerror("Error", "El monto debe ser un número válido", parent=dialog)
+                return
+            try:
+                inicio = datetime.strptime(values["inicio"], DATE_FORMAT)
+                if values["fin"] and datetime.strptime(values["fin"], DATE_FORMAT) < inicio:
+                    messagebox.showerror("Error", "La fecha de fin es anterior al inicio", parent=dialog)
+                    return
+            except ValueError:
+                messagebox.showerror("Error", "Formato de fecha inválido (DD/MM/YYYY)", parent=dialog)
+                return
+
+            if rule:
+                rule.update(values)
+                self.table.item(rule["id"], values=[rule[col] for col in self.table["columns"]])
+            else:
+                new_rule = {"id": uuid.uuid4().hex, **values, "ultima": ""}
+                self.rules.append(new_rule)
+                self.table.insert("", tk.END, iid=new_rule["id"], 
+                                  values=[new_rule[col] for col in self.table["columns"]])
+            dialog.destroy()
+
+        ttk.Button(dialog, text="Guardar", command=save).pack(pady=10)
+
+    def delete_rule(self):
+        selection = self.table.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Por favor selecciona una regla para eliminar")
+            return
+
+        # Los registros ya generados se conservan
+        if messagebox.askyesno("Confirmar", "¿Eliminar la regla? Los registros ya generados se conservan."):
+            self.rules = [rule for rule in self.rules if rule["id"] != selection[0]]
+            self.table.delete(selection[0])
+
+    def save_rules(self):
+        self.save_callback(self.rules)
+        self.window.destroy()
+
+class BudgetManager:
+    def __init__(self, parent, categories, budgets, planner, save_callback):
+        self.window = tk.Toplevel(parent)
+        self.window.title("Presupuestos")
+        self.window.geometry("800x400")
+        self.categories = categories
+        self.budgets = dict(budgets)
+        self.planner = planner
+        self.save_callback = save_callback
+        self.create_widgets()
+
+    def create_widgets(self):
+        horizon = self.planner.horizon
+        self.columns = (["Categoría", "Presupuesto", "Gastado", "Fin de mes"] +
+                        [f"Mes +{i}" for i in range(1, horizon + 1)])
+        self.table = ttk.Treeview(self.window, columns=self.columns, show="headings")
+        for col in self.columns:
+            self.table.heading(col, text=col)
+            self.table.column(col, width=100)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.table.bind('<<TreeviewSelect>>', self.on_select)
+
+        projections = self.planner.projections(self.categories, date.today())
+        for categoria in self.categories:
+            self.table.insert("", tk.END, iid=categoria, values=self.row_values(categoria, projections[categoria]))
+
+        # Asignar presupuesto a la categoría seleccionada
+        edit_frame = ttk.Frame(self.window)
+        edit_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        ttk.Label(edit_frame, text="Presupuesto mensual:").pack(side=tk.LEFT, padx=5)
+        self.limit_var = tk.StringVar()
+        ttk.Entry(edit_frame, textvariable=self.limit_var, width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(edit_frame, text="Asignar", 
+                  command=self.set_budget).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(edit_frame, text="Guardar", 
+                  command=self.save_budgets).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(edit_frame, text="Cancelar", 
+                  command=self.window.destroy).pack(side=tk.RIGHT, padx=5)
+
+    def row_values(self, categoria, projection):
+        limit = self.budgets.get(categoria)
+        return ([categoria, f"${limit:,.2f}" if limit else "-",
+                 f"${projection['gastado']:,.2f}", f"${projection['fin_de_mes']:,.2f}"] +
+                [f"${value:,.2f}" for value in projection["pronostico"]])
+
+    def on_select(self, event=None):
+        selection = self.table.selection()
+        if selection:
+            limit = self.budgets.get(selection[0])
+            self.limit_var.set(f"{limit:g}" if limit else "")
+
+    def set_budget(self):
+        selection = self.table.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Por favor selecciona una categoría", parent=self.window)
+            return
+        categoria = selection[0]
+        text = self.limit_var.get().strip()
+        if text:
+            try:
+                limit = float(text)
+                if limit <= 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", "El presupuesto debe ser un número positivo", parent=self.window)
+                return
+            self.budgets[categoria] = limit
+        else:
+            # Vacío quita el presupuesto
+            self.budgets.pop(categoria, None)
+        projection = self.planner.projections([categoria], date.today())[categoria]
+        self.table.item(categoria, values=self.row_values(categoria, projection))
+
+    def save_budgets(self):
+        self.save_callback(self.budgets)
         self.window.destroy()
 
 if __name__ == "__main__":
-    app = FinancialManager()
-    app.root.mainloop()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+    else:
+        app = FinancialManager()
+        app.root.mainloop()
\ No newline at end of file
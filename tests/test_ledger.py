@@ -0,0 +1,187 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from datetime import date
+
+MODULE_PATH = os.path.join(os.path.dirname(__file__), "..", "financial-manager.py")
+spec = importlib.util.spec_from_file_location("financial_manager", MODULE_PATH)
+fm = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fm)
+
+
+def aggregates(ledger):
+    return ledger.category_totals, ledger.category_counts, {
+        key: {month: amount for month, amount in months.items() if amount}
+        for key, months in ledger.monthly_totals.items() if any(months.values())
+    }
+
+
+class RecategorizeTest(unittest.TestCase):
+    def test_swap_keeps_aggregates_consistent(self):
+        ledger = fm.Ledger([
+            ["Egreso", "a", "10", "A", "01/01/2024", "", "1"],
+            ["Egreso", "b", "20", "B", "02/01/2024", "", "2"],
+            ["Egreso", "c", "5", "B", "03/02/2024", "", "3"],
+        ])
+        # Mapeo que produce CategoryManager al intercambiar A y B pasando por X
+        ledger.recategorize("Egreso", {"A": "B", "B": "A", "X": "B"})
+
+        self.assertEqual([row[3] for row in ledger.rows()], ["B", "A", "A"])
+        self.assertEqual(ledger.category_totals["Egreso"], {"B": 10.0, "A": 25.0})
+        self.assertEqual(ledger.category_counts["Egreso"], {"B": 1, "A": 2})
+        self.assertEqual(aggregates(ledger), aggregates(fm.Ledger(ledger.rows())))
+
+
+class BalanceIndexTest(unittest.TestCase):
+    SIGNS = {"Ingreso": (1, 1), "Egreso": (1, -1), "Activo": (0, 1), "Pasivo": (0, -1)}
+
+    def brute_force(self, ledger, ordinal):
+        totals = [0.0, 0.0]
+        for row in ledger.rows():
+            day = fm.parse_date_ordinal(row[4])
+            if day and day <= ordinal:
+                series, sign = self.SIGNS[row[0]]
+                totals[series] += sign * float(row[2])
+        return tuple(totals)
+
+    def assert_matches(self, ledger):
+        start = date(2025, 12, 25).toordinal()
+        for ordinal in range(start, start + 60):
+            for got, expected in zip(ledger.balances.as_of(ordinal), self.brute_force(ledger, ordinal)):
+                self.assertAlmostEqual(got, expected)
+
+    def test_backdated_edits_and_deletes_recompute_suffix(self):
+        ledger = fm.Ledger([
+            ["Ingreso", "sueldo", "1000", "Salario", "01/01/2026", "", "1"],
+            ["Egreso", "super", "200", "Alimentación", "10/01/2026", "", "2"],
+            ["Activo", "banco", "5000", "Efectivo", "15/01/2026", "", "3"],
+            ["Pasivo", "tarjeta", "300", "Otros", "20/01/2026", "", "4"],
+        ])
+        self.assert_matches(ledger)
+        # Mover un registro a una fecha anterior a todas las existentes
+        ledger.update(["Egreso", "super", "250", "Alimentación", "28/12/2025", "", "2"])
+        self.assert_matches(ledger)
+        ledger.add([["Egreso", "luz", "80", "Servicios", "05/01/2026", "", "5"]])
+        self.assert_matches(ledger)
+        ledger.delete(["1", "4"])
+        self.assert_matches(ledger)
+
+
+class FingerprintIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = fm.FingerprintIndex()
+        for row in (
+            ["Egreso", "Super  Día", "10.5", "Alimentación", "01/02/2026", "", "a"],
+            ["Egreso", "super día", "10.50", "alimentación", "1/2/2026", "otra nota", "b"],
+            ["Egreso", "super", "10.5", "Alimentación", "03/02/2026", "", "c"],
+            ["Egreso", "super", "10.5", "Alimentación", "20/02/2026", "", "d"],
+            ["Ingreso", "super", "10.5", "Alimentación", "02/02/2026", "", "e"],
+        ):
+            self.index.add(row)
+
+    def test_exact_find_normalizes_fields(self):
+        row = ["egreso ", "SUPER DÍA", "10.5", "Alimentación", "01/02/2026", "", "nuevo"]
+        self.assertEqual(self.index.find(row), ["a", "b"])
+        # La propia fila no cuenta como duplicado
+        self.assertEqual(self.index.find(["Egreso", "super", "10.5", "Alimentación", "03/02/2026", "", "c"]), [])
+
+    def test_fuzzy_find_uses_date_window_and_type(self):
+        row = ["Egreso", "otra", "10.5", "Otros", "02/02/2026", "", "nuevo"]
+        self.assertEqual(self.index.find(row), [])
+        self.assertEqual(self.index.find(row, fuzzy_days=1), ["a", "b", "c"])
+
+    def test_duplicate_groups(self):
+        self.assertEqual(self.index.duplicate_groups(), [["a", "b"]])
+        self.assertEqual(sorted(map(sorted, self.index.duplicate_groups(fuzzy_days=2))), [["a", "b", "c"]])
+
+    def test_remove_updates_both_indexes(self):
+        self.index.remove(["Egreso", "super día", "10.50", "alimentación", "1/2/2026", "otra nota", "b"])
+        self.assertEqual(self.index.duplicate_groups(), [])
+        self.assertEqual(sorted(map(sorted, self.index.duplicate_groups(fuzzy_days=2))), [["a", "c"]])
+
+
+class BudgetPlannerTest(unittest.TestCase):
+    def test_short_history_does_not_inflate_forecast(self):
+        ledger = fm.Ledger([
+            ["Egreso", "super", "100", "Comida", f"05/{month:02d}/2026", "", str(month)]
+            for month in (7, 8, 9)
+        ])
+        planner = fm.BudgetPlanner(ledger, 12, 3)
+        today = date(2026, 10, 1)
+
+        projection = planner.projections(["Comida"], today)["Comida"]
+        for value in projection["pronostico"]:
+            self.assertAlmostEqual(value, 100.0)
+        self.assertEqual(planner.alerts({"Comida": 100}, today), [])
+
+
+class RecurringTest(unittest.TestCase):
+    def rule(self, **fields):
+        return {"id": "regla", "Tipo": "Egreso", "Descripción": "alquiler", "Monto": "500",
+                "Categoría": "Servicios", "frecuencia": "Mensual", "inicio": "31/01/2026",
+                "ultima": "", **fields}
+
+    def test_monthly_clamps_to_month_end_without_drifting(self):
+        occurrences = fm.recurring_occurrences(self.rule(), date(2026, 5, 30))
+        self.assertEqual(occurrences, [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31),
+                                       date(2026, 4, 30)])
+
+    def test_watermark_skips_materialized_periods(self):
+        rule = self.rule(ultima="28/02/2026", fin="30/06/2026")
+        self.assertEqual(fm.recurring_occurrences(rule, date(2026, 12, 31)),
+                         [date(2026, 3, 31), date(2026, 4, 30), date(2026, 5, 31), date(2026, 6, 30)])
+        weekly = self.rule(frecuencia="Semanal", inicio="01/01/2026", ultima="15/01/2026")
+        self.assertEqual(fm.recurring_occurrences(weekly, date(2026, 1, 29)),
+                         [date(2026, 1, 22), date(2026, 1, 29)])
+
+    def test_materialize_is_idempotent(self):
+        ledger = fm.Ledger([])
+        rows = fm.materialize_recurring([self.rule()], ledger, date(2026, 4, 30))
+        ledger.add(rows)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(fm.materialize_recurring([self.rule()], ledger, date(2026, 4, 30)), [])
+        # Una regla recreada con otro id no repite los registros existentes
+        self.assertEqual(fm.materialize_recurring([self.rule(id="otra")], ledger, date(2026, 4, 30)), [])
+
+
+class StorageTest(unittest.TestCase):
+    CSV = (
+        "Tipo,Descripción,Monto,Categoría,Fecha,Notas,id\r\n"
+        "Egreso,\"pan, leche\",10.5,Alimentación,01/02/2024,,a1\r\n"
+        "Ingreso,sueldo,1000,Salario,1/2/2024,nota ñ,a2\r\n"
+        "Egreso,corta,5,Otros\r\n"
+        "Egreso,larga,7,Otros,03/02/2024,,a3,extra,mas\r\n"
+        "\r\n"
+        "Egreso,nan,nan,Otros,04/02/2024,,a4\r\n"
+        "Egreso,cero,-0,Otros,fecha rara,,a5\r\n"
+        "Egreso,decimal,2.50,Otros,05/02/2024,,a6\r\n"
+    )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.csv_path = os.path.join(self.directory.name, "datos.csv")
+        with open(self.csv_path, "w", encoding="utf-8", newline="") as f:
+            f.write(self.CSV)
+
+    def test_columnar_round_trip_is_byte_identical(self):
+        columnar = fm.ColumnarStorage(os.path.join(self.directory.name, "datos.fcol"))
+        columnar.write_rows(fm.CsvStorage(self.csv_path).read_rows())
+        copy_path = os.path.join(self.directory.name, "copia.csv")
+        fm.CsvStorage(copy_path).write_rows(columnar.read_rows())
+
+        with open(self.csv_path, "rb") as original, open(copy_path, "rb") as copy:
+            self.assertEqual(original.read(), copy.read())
+
+    def test_read_columns_pads_short_rows(self):
+        columnar = fm.ColumnarStorage(os.path.join(self.directory.name, "datos.fcol"))
+        columnar.write_rows(fm.CsvStorage(self.csv_path).read_rows())
+        for storage in (fm.CsvStorage(self.csv_path), columnar):
+            columns = storage.read_columns(["Tipo", "Monto", "Fecha"])
+            self.assertEqual(columns["Tipo"][3:5], ["Egreso", ""])
+            self.assertEqual(columns["Fecha"][2], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()